@@ -0,0 +1,118 @@
+"""Compares the streaming feed parser of zenox.clients.ytb with feedparser.
+
+Usage:
+    python -m benchmarks.rss_parsing [FEED.xml ...] [--rounds N]
+
+Without feed files a synthetic feed shaped like a YouTube channel feed (15 entries with media groups) is used.
+Record real feeds with e.g. `curl -o genshin.xml "https://www.youtube.com/feeds/videos.xml?channel_id=..."`.
+Besides raw parse time it reports the longest event loop stall while five feeds are parsed on the loop versus
+in a worker thread, which is what the shards feel as delayed heartbeats.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+from zenox.clients.ytb import parse_feed_full, parse_feed_streaming
+
+ENTRY = """
+ <entry>
+  <id>yt:video:{video_id}</id>
+  <yt:videoId>{video_id}</yt:videoId>
+  <yt:channelId>UCiS882YPwZt1NfaM0gR0D9Q</yt:channelId>
+  <title>Version {i}.0 Special Program | Genshin Impact</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+  <author><name>Genshin Impact</name><uri>https://www.youtube.com/channel/UCiS882YPwZt1NfaM0gR0D9Q</uri></author>
+  <published>2026-03-{day:02d}T10:00:00+00:00</published>
+  <updated>2026-03-{day:02d}T12:00:00+00:00</updated>
+  <media:group>
+   <media:title>Version {i}.0 Special Program | Genshin Impact</media:title>
+   <media:content url="https://www.youtube.com/v/{video_id}?version=3" type="application/x-shockwave-flash" width="640" height="390"/>
+   <media:thumbnail url="https://i2.ytimg.com/vi/{video_id}/hqdefault.jpg" width="480" height="360"/>
+   <media:description>{description}</media:description>
+   <media:community>
+    <media:starRating count="12345" average="5.00" min="1" max="5"/>
+    <media:statistics views="1234567"/>
+   </media:community>
+  </media:group>
+ </entry>"""
+
+
+def synthetic_feed(entries: int = 15) -> bytes:
+    description = "Travelers, the special program is coming! " * 40
+    body = "".join(
+        ENTRY.format(video_id=f"vid{i:08d}", i=i, day=(i % 28) + 1, description=description) for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/" '
+        'xmlns="http://www.w3.org/2005/Atom">\n'
+        ' <title>Genshin Impact</title>' + body + "\n</feed>\n"
+    ).encode()
+
+
+def bench(name: str, func: Callable[[], object], rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    print(f"{name:<40} median {median * 1000:8.3f} ms  (min {min(timings) * 1000:.3f} ms)")
+    return median
+
+
+async def loop_stall(feeds: list[bytes], parse: Callable[[bytes], object], *, offload: bool) -> float:
+    """Longest gap between ticks of a 1 ms ticker while all feeds are parsed."""
+    stalls: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    for feed in feeds:
+        if offload:
+            await asyncio.to_thread(parse, feed)
+        else:
+            parse(feed)
+        await asyncio.sleep(0)
+    done.set()
+    await task
+    return max(stalls)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("feeds", nargs="*", type=Path, help="recorded channel feeds")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    feeds = [path.read_bytes() for path in args.feeds] or [synthetic_feed()]
+    for index, feed in enumerate(feeds):
+        label = args.feeds[index].name if args.feeds else "synthetic"
+        first_id = parse_feed_streaming(feed)["entries"][0]["yt_videoid"]
+        print(f"\n{label}: {len(feed) / 1024:.1f} KiB")
+        full = bench("feedparser", lambda: parse_feed_full(feed), args.rounds)
+        streaming = bench("streaming, whole feed", lambda: parse_feed_streaming(feed), args.rounds)
+        early = bench("streaming, stop at newest seen", lambda: parse_feed_streaming(feed, {first_id}), args.rounds)
+        print(f"speedup: {full / streaming:.1f}x whole feed, {full / early:.1f}x with an unchanged feed")
+
+    five = (feeds * 5)[:5]
+    print("\nlongest event loop stall while parsing five feeds")
+    print(f"feedparser on the loop       {asyncio.run(loop_stall(five, parse_feed_full, offload=False)) * 1000:8.3f} ms")
+    print(f"streaming in a worker thread {asyncio.run(loop_stall(five, parse_feed_streaming, offload=True)) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 import logging
 import argparse
+import sys
 from zenox.config import CONFIG
 from zenox.bot import Zenox
 from zenox.utils import init_sentry
 from zenox.enums import PrintColors
 
 
+if CONFIG.cluster_workers and CONFIG.cluster_id is None:
+    # Launcher mode, every worker runs this file again with its shard range
+    from zenox.cluster import ClusterLauncher
+    sys.exit(ClusterLauncher(CONFIG).run())
+
 init_sentry()
 
 parser = argparse.ArgumentParser(description="Zenox Discord Bot")
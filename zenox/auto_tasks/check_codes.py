@@ -1,20 +1,26 @@
 from __future__ import annotations
 
 import asyncio
+import random
 import time
-import aiohttp
 from typing import TYPE_CHECKING, ClassVar, TypedDict, Any, Required
 import discord
+from discord.utils import MISSING
 from fake_useragent import UserAgent
 
 from zenox import emojis
-from zenox.constants import CODE_URLS, ZENOX_LOCALES, HOYO_REDEEM_URLS, GAME_THUMBNAILS, GAME_TO_ID, HOYOLAB_STREAM_CODES_ENDPOINT
-from zenox.db.mongodb import DB
+from zenox.constants import CHECK_CODES_GAME_TIMEOUT, CHECK_CODES_IDLE_INTERVAL, CHECK_CODES_INTERVAL, CHECK_CODES_JITTER, CHECK_CODES_STREAM_INTERVAL, STREAM_LEAD_TIME, STREAM_WINDOW_AFTER, STREAM_WINDOW_BEFORE, CODE_URLS, ZENOX_LOCALES, HOYO_REDEEM_URLS, GAME_THUMBNAILS, GAME_TO_ID, HOYOLAB_STREAM_CODES_ENDPOINT
+from zenox.db.mongodb import channel_configured
 from zenox.enums import Game, PrintColors
+from zenox.metrics import CHECK_CODES_DURATION_HISTOGRAM
 from zenox.embeds import Embed
-from zenox.db.classes import Guild, RedemptionCode, SpecialProgram
+from zenox.db.classes import Broadcast, DeliveryRecord, Guild, RedemptionCode, SpecialProgram, StreamCodesConfig
+from zenox.delivery import SCHEDULER, SEND_MESSAGE, BroadcastHandler, Deliver, OutboxWorker, resolve_messageable, role_mention
 from zenox.ui.components import View, Button
 from zenox.l10n import LocaleStr
+from zenox.utils import CachedResponse, HTTPCache
+from zenox.clients.breaker import CircuitOpenError
+from zenox.clients.http import HTTPClient
 from zenox.ui.hoyolab_codes.view import HoyolabCodesUI
 
 if TYPE_CHECKING:
@@ -32,8 +38,13 @@ class CodeFetchResult(TypedDict):
 
 class CheckCodes:
     _client: ClassVar[Zenox]
-    _lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+    _locks: ClassVar[dict[Game, asyncio.Lock]] = {game: asyncio.Lock() for game in CODE_URLS}
     _ua = UserAgent()
+    _http_cache: ClassVar[HTTPCache] = HTTPCache("hoyo_codes")
+    # Last good HoYoLAB response per game, served while its circuit is open
+    _last_stream_codes: ClassVar[dict[Game, dict[str, Any]]] = {}
+    # When each game is checked next, see _plan_next_run
+    _next_runs: ClassVar[dict[Game, float]] = {}
 
     @classmethod
     def _get_header(cls, gameID: int):
@@ -69,28 +80,32 @@ class CheckCodes:
         return HEADERS
 
     @classmethod
-    async def _get_codes(cls, session: aiohttp.ClientSession, game: Game) -> CodeFetchResult:
-        response = await session.get(CODE_URLS[game], headers={"User-Agent": cls._ua.random})
-        response.raise_for_status()
-        codes = await response.json()
-        return codes
+    async def _get_codes(cls, http: HTTPClient, game: Game) -> CachedResponse | None:
+        """Returns None if the codes did not change since the last processed fetch."""
+        return await cls._http_cache.get_json(http, CODE_URLS[game], headers={"User-Agent": cls._ua.random})
     
     @classmethod
     async def _get_stream_codes(
         cls,
-        session: aiohttp.ClientSession,
+        http: HTTPClient,
         game: Game,
     ) -> dict[str, Any]:
         try:
-            response = await session.get(
+            response = await http.get(
                 HOYOLAB_STREAM_CODES_ENDPOINT.format(game_id=GAME_TO_ID[game]),
                 headers=cls._get_header(GAME_TO_ID[game]),
             )
             response.raise_for_status()
-            data = await response.json()
+            data = response.json()
             print(f"[CheckCodes] Info - {PrintColors.OKCYAN}Stream codes fetched{PrintColors.ENDC}")
 
+            cls._last_stream_codes[game] = data
             return data
+        except CircuitOpenError as e:
+            print(f"[CheckCodes] Warning - {PrintColors.WARNING}Skipping stream codes for {game.value}: {e}{PrintColors.ENDC}")
+            if game in cls._last_stream_codes:
+                return cls._last_stream_codes[game]
+            return {"retcode": -1, "message": str(e), "data": {"modules": [], "in_feed_modules": [], "server_time": "0"}}
         except Exception as e:
             print(f"[CheckCodes] Error - {PrintColors.FAIL}Failed to fetch stream codes for {game.value}:{PrintColors.ENDC} {e}")
             cls._client.capture_exception(e)
@@ -98,22 +113,26 @@ class CheckCodes:
             return {"retcode": -1, "message": str(e), "data": {"modules": [], "in_feed_modules": [], "server_time": "0"}}
 
     @classmethod
-    async def _handle_non_stream_codes(cls, session: aiohttp.ClientSession, game: Game) -> None:
-        codes = await cls._get_codes(session, game)
+    async def _handle_non_stream_codes(cls, http: HTTPClient, game: Game) -> None:
+        response = await cls._get_codes(http, game)
+        if response is None:
+            print(f"[CheckCodes] Info - {PrintColors.OKCYAN}Non-stream codes for {game.value} did not change, skipping.{PrintColors.ENDC}")
+            return
+
+        codes: CodeFetchResult = response.data
         print(f"[CheckCodes] Info - {PrintColors.OKCYAN}Non-stream codes for {game.value}:{PrintColors.ENDC} {codes}")
-        published_codes: list[dict[str, str]] = []
-        for code_data in codes["codes"]:
-            if code_data["status"] != "OK":
-                continue
-            redemption_code = await RedemptionCode.new(code=code_data["code"].upper(), game=game)
+        redemption_codes = await RedemptionCode.new_many(
+            [code_data["code"].upper() for code_data in codes["codes"] if code_data["status"] == "OK"], game
+        )
+        new_codes = [redemption_code for redemption_code in redemption_codes if not redemption_code.published]
+        published_codes: list[dict[str, str]] = [{"code": redemption_code.code} for redemption_code in new_codes]
 
-            if not redemption_code.published:
-                published_codes.append({"code": code_data["code"].upper()})
-                redemption_code.published = True
-                await DB.codes.update_one({"code": redemption_code.code, "game": redemption_code.game.value}, {"$set": {"published": True}})
-                            
         if published_codes:
-            await cls.notify_codes(game, published_codes)
+            # Persist the broadcast before marking the codes published, so a restart cannot lose the notification
+            broadcast = await Broadcast.new(cls._codes_broadcast_id(game, published_codes), "codes", {"game": game.value, "codes": published_codes})
+            await RedemptionCode.mark_published(new_codes)
+            cls.notify_codes(broadcast)
+        cls._http_cache.confirm(response)
         print(f"[CheckCodes] Info - {PrintColors.OKGREEN}Published codes for {game.name}:{PrintColors.ENDC} {published_codes}")
     
     @classmethod
@@ -140,7 +159,8 @@ class CheckCodes:
 
             view = HoyolabCodesUI(author=None, locale=discord.Locale.american_english, data=special_program)
 
-            msg_content = f"State: `{client.db_config.stream_codes_config[special_program.game].state}` Version: `{client.db_config.stream_codes_config[special_program.game].version}` Next Update <t:{round(time.time()+300)}:R>"
+            next_update = cls._next_runs.get(special_program.game, time.time() + CHECK_CODES_INTERVAL)
+            msg_content = f"State: `{client.db_config.stream_codes_config[special_program.game].state}` Version: `{client.db_config.stream_codes_config[special_program.game].version}` Next Update <t:{round(next_update)}:R>"
             
             if embed_only:
                 await message.edit(embed=embed)
@@ -152,11 +172,11 @@ class CheckCodes:
 
     
     @classmethod
-    async def _handle_hoyolab_codes(cls, session: aiohttp.ClientSession, game: Game, special_program: SpecialProgram) -> None:
+    async def _handle_hoyolab_codes(cls, http: HTTPClient, game: Game, special_program: SpecialProgram) -> None:
         if special_program.codes_count != 0 and special_program.codes_count == len(special_program.codes):
             print(f"[CheckCodes] Info - {PrintColors.WARNING}Codes for {game.value} stream already up to date. Skipping fetch.{PrintColors.ENDC}")
             return
-        codes = await cls._get_stream_codes(session, game)
+        codes = await cls._get_stream_codes(http, game)
         module_data: dict[str, Any] | None = None
         for module in codes["data"]["modules"]:
             if module["module_type"] != 7:
@@ -177,45 +197,99 @@ class CheckCodes:
             if special_program.codes_expire_at is None or special_program.codes_expire_at != int(bonus["offline_at"]):
                 await special_program._update_val("codes_expire_at", int(bonus["offline_at"]))
             published_codes.append({"code": bonus["exchange_code"].upper()})
-            redemption_code = await RedemptionCode.new(code=bonus["exchange_code"].upper(), game=game)
-            if not redemption_code.published:
-                await special_program._add_code(redemption_code)
-                redemption_code.published = True
-                await DB.codes.update_one({"code": redemption_code.code, "game": redemption_code.game.value}, {"$set": {"published": True}})
+
+        redemption_codes = await RedemptionCode.new_many([code_data["code"] for code_data in published_codes], game)
+        new_codes = [redemption_code for redemption_code in redemption_codes if not redemption_code.published]
+        for redemption_code in new_codes:
+            await special_program._add_code(redemption_code)
+        await RedemptionCode.mark_published(new_codes)
         print(f"[CheckCodes] Info - {PrintColors.OKGREEN}Published stream codes for {game.value}:{PrintColors.ENDC} {published_codes}")
 
     @classmethod
-    async def execute(cls, client: Zenox) -> None:
-        if cls._lock.locked():
-            print(f"[CheckCodes] Warning - {PrintColors.WARNING}CheckCodes is already running, skipping this execution.{PrintColors.ENDC}")
-            return
-        
-        if client.session is None:
+    def _streaming(cls, config: StreamCodesConfig, now: float) -> bool:
+        """Whether the special program starts within STREAM_LEAD_TIME or already started and is not done."""
+        return bool(config.stream_time) and config.state != 5 and config.stream_time - now < STREAM_LEAD_TIME
+
+    @classmethod
+    def _plan_next_run(cls, config: StreamCodesConfig, special_program: SpecialProgram, now: float) -> float:
+        """Polls every CHECK_CODES_STREAM_INTERVAL seconds during the stream window until all codes are found,
+        every CHECK_CODES_INTERVAL seconds in the hour before it and after it, and every CHECK_CODES_IDLE_INTERVAL
+        seconds otherwise. Intervals are jittered, but a run never lands after the start of a faster phase."""
+        codes_complete = special_program.codes_count != 0 and special_program.codes_count == len(special_program.codes)
+        upcoming = bool(config.stream_time) and config.state != 5
+        window_start = config.stream_time - STREAM_WINDOW_BEFORE
+        window_end = config.stream_time + STREAM_WINDOW_AFTER
+        until = float("inf")
+        if upcoming and window_start <= now < window_end and not codes_complete:
+            delay = CHECK_CODES_STREAM_INTERVAL
+        elif upcoming and now < config.stream_time - STREAM_LEAD_TIME:
+            delay, until = CHECK_CODES_IDLE_INTERVAL, config.stream_time - STREAM_LEAD_TIME
+        elif upcoming and now < window_start:
+            delay, until = CHECK_CODES_INTERVAL, window_start
+        elif upcoming:  # Codes complete or window over, until the program is marked done
+            delay = CHECK_CODES_INTERVAL
+        else:
+            delay = CHECK_CODES_IDLE_INTERVAL
+        return min(now + delay * random.uniform(1 - CHECK_CODES_JITTER, 1 + CHECK_CODES_JITTER), until)
+
+    @classmethod
+    def next_run(cls, game: Game) -> float:
+        """Time of the next check of the game, for its scheduler loop."""
+        return cls._next_runs.get(game, 0)
+
+    @classmethod
+    async def execute(cls, client: Zenox, game: Game) -> None:
+        """Checks the codes of one game. Every game runs in its own scheduler loop on its own schedule."""
+        assert client.db_config is not None, "Bot configuration is not loaded yet."
+
+        cls._client = client
+        await cls._check_game(client, game)
+
+    @classmethod
+    async def _check_game(cls, client: Zenox, game: Game) -> None:
+        lock = cls._locks[game]
+        if lock.locked():
+            print(f"[CheckCodes] Warning - {PrintColors.WARNING}CheckCodes for {game.value} is already running, skipping this execution.{PrintColors.ENDC}")
             return
-        
+
         assert client.db_config is not None, "Bot configuration is not loaded yet."
 
-        async with cls._lock:
-            cls._client = client
-            for game in CODE_URLS.keys():
-                print(f"[CheckCodes] Info - {PrintColors.HEADER}Checking codes for {game.value}{PrintColors.ENDC}")
-                try:
-                    if client.db_config.stream_codes_config[game].stream_time and client.db_config.stream_codes_config[game].state != 5 and client.db_config.stream_codes_config[game].stream_time - int(time.time()) < 3600:
+        async with lock:
+            start = time.perf_counter()
+            outcome = "ok"
+            print(f"[CheckCodes] Info - {PrintColors.HEADER}Checking codes for {game.value}{PrintColors.ENDC}")
+            try:
+                async with asyncio.timeout(CHECK_CODES_GAME_TIMEOUT):
+                    if cls._streaming(client.db_config.stream_codes_config[game], time.time()):
                         print(f"[CheckCodes] Info - {PrintColors.OKBLUE}Stream for {game.value} is starting within an hour or already started. Fetching stream codes.{PrintColors.ENDC}")
                         special_program = await SpecialProgram.new(game=game, version=client.db_config.stream_codes_config[game].version)
-                        await cls._handle_hoyolab_codes(client.session, game, special_program)
+                        await cls._handle_hoyolab_codes(client.http_client, game, special_program)
                     else:
                         print(f"[CheckCodes] Info - {PrintColors.OKCYAN}Fetching non-stream codes for {game.value}.{PrintColors.ENDC}")
-                        await cls._handle_non_stream_codes(client.session, game)
+                        await cls._handle_non_stream_codes(client.http_client, game)
+            except CircuitOpenError as e:
+                outcome = "circuit_open"
+                print(f"[CheckCodes] Warning - {PrintColors.WARNING}Skipping codes for {game.value}: {e}{PrintColors.ENDC}")
+            except TimeoutError as e:
+                # Only fetching and diffing is timed, broadcasts are drained by OutboxWorker in their own task
+                outcome = "timeout"
+                print(f"[CheckCodes] Error - {PrintColors.FAIL}Checking codes for {game.value} timed out after {CHECK_CODES_GAME_TIMEOUT}s.{PrintColors.ENDC}")
+                client.capture_exception(e)
+            except Exception as e:
+                outcome = "error"
+                print(f"[CheckCodes] Error - {PrintColors.FAIL}An error occurred while checking codes for {game.value}:{PrintColors.ENDC} {e}")
+                client.capture_exception(e)
+            finally:
+                try:
+                    # Served from the SpecialProgram identity map if the stream branch already loaded it
+                    special_program = await SpecialProgram.new(game=game, version=client.db_config.stream_codes_config[game].version)
+                    cls._next_runs[game] = cls._plan_next_run(client.db_config.stream_codes_config[game], special_program, time.time())
+                    await cls._update_message(client.db_config.stream_codes_config[game].channel, client.db_config.stream_codes_config[game].message, special_program)
                 except Exception as e:
-                    print(f"[CheckCodes] Error - {PrintColors.FAIL}An error occurred while checking codes for {game.value}:{PrintColors.ENDC} {e}")
                     client.capture_exception(e)
-                finally:
-                    try:
-                        special_program = await SpecialProgram.new(game=game, version=client.db_config.stream_codes_config[game].version)
-                        await cls._update_message(client.db_config.stream_codes_config[game].channel, client.db_config.stream_codes_config[game].message, special_program)
-                    except Exception as e:
-                        client.capture_exception(e)
+                if cls._next_runs.get(game, 0) <= time.time():  # Planning failed, retry at the regular pace
+                    cls._next_runs[game] = time.time() + CHECK_CODES_INTERVAL
+                CHECK_CODES_DURATION_HISTOGRAM.labels(game.name, outcome).observe(time.perf_counter() - start)
 
 
     @classmethod
@@ -250,50 +324,86 @@ class CheckCodes:
         return _translations, _embeds, _view
 
     @classmethod
-    async def notify_codes(cls, game: Game, codes: list[dict[str, str]]) -> None:
-        """Notifies guilds about new codes for a specific game."""
-        print(f"[CheckCodes] Info - {PrintColors.OKGREEN}Notifying guilds about new codes for {game.value}.{PrintColors.ENDC} Codes: {codes}")
-        notifies = DB.guilds.find({f"codes.{game.value}.channel": {"$ne": None}}, {"_id": 0, "id": 1})
-        translations, embeds, view = cls._pre_translate(codes, game)
-        async for guild_data in notifies:
-            try:
-                role = None
-                guild = await Guild.new(guild_data["id"])
-
-                mention_role: bool = guild.codes[game].mention_role is not None
-                mention_everyone: bool = guild.codes[game].mention_everyone
-
-
-                channel_id = guild.codes[game].channel
-                if channel_id is None:
-                    continue
-                
-                channel = cls._client.get_channel(channel_id) or await cls._client.fetch_channel(channel_id)
-                if not channel:
-                    await guild._update_module_setting(
-                        "codes",
-                        game,
-                        "channel",
-                        None
-                    )
-                    continue
-
-                role_id = guild.codes[game].mention_role
-                if role_id is not None:
-                    guild_obj = cls._client.get_guild(guild.id) or await cls._client.fetch_guild(guild.id)
-                    role = guild_obj.get_role(role_id)
-                
-                if not role:
-                    # Update DB to remove invalid role
-                    await guild._update_module_setting(
-                        "codes",
-                        game,
-                        "mention_role",
-                        None
-                    )
-                    mention_role = False
-                
-                send_msg = f"{role.mention + ' ' if mention_role and role else ''}{'@everyone ' if mention_everyone else ''}{translations[guild.language]['content']}"
-                await channel.send(send_msg, embed=embeds[guild.language], view=view) # pyright: ignore
-            except Exception as e:
-                cls._client.capture_exception(e)
\ No newline at end of file
+    def _codes_broadcast_id(cls, game: Game, codes: list[dict[str, str]]) -> str:
+        return f"codes:{game.value}:{'+'.join(sorted(code['code'] for code in codes))}"
+
+    @classmethod
+    def notify_codes(cls, broadcast: Broadcast) -> None:
+        """Notifies guilds about new codes for a specific game. The delivery runs as its own task, outside the
+        timeout of the code check."""
+        print(f"[CheckCodes] Info - {PrintColors.OKGREEN}Notifying guilds about new codes for {broadcast.payload['game']}.{PrintColors.ENDC} Codes: {broadcast.payload['codes']}")
+        OutboxWorker.start(cls._client, broadcast)
+
+    @classmethod
+    async def _prepare_codes_broadcast(cls, client: Zenox, broadcast: Broadcast) -> Deliver:
+        game = Game(broadcast.payload["game"])
+        translations, embeds, view = cls._pre_translate(broadcast.payload["codes"], game)
+
+        async def deliver(record: DeliveryRecord, nonce: str) -> bool:
+            return await cls._notify_guild(client, record, game, translations, embeds, view, nonce=nonce)
+
+        return deliver
+
+    @classmethod
+    async def _notify_guild(
+        cls,
+        client: Zenox,
+        record: DeliveryRecord,
+        game: Game,
+        translations: dict[discord.Locale, dict[str, str]],
+        embeds: dict[discord.Locale, Embed],
+        view: View,
+        *,
+        nonce: str = MISSING,
+    ) -> bool:
+        """Sends the codes notification to a single guild. Returns True if a message was sent."""
+        mention = None
+        mention_everyone: bool = record.mention_everyone
+
+        channel_id = record.channel
+        if channel_id is None:
+            return False
+
+        channel = resolve_messageable(client, channel_id, record.guild_id)
+        if not channel:
+            return False
+
+        role_id = record.mention_role
+        if role_id is not None:
+            mention = role_mention(client, record.guild_id, role_id)
+
+            if not mention:
+                # Update DB to remove invalid role
+                await Guild._update_module_setting_by_id(
+                    record.guild_id,
+                    "codes",
+                    game,
+                    "mention_role",
+                    None
+                )
+
+        send_msg = f"{mention + ' ' if mention else ''}{'@everyone ' if mention_everyone else ''}{translations[record.language]['content']}"
+        try:
+            async with SCHEDULER.acquire(SEND_MESSAGE, channel_id):
+                await channel.send(send_msg, embed=embeds[record.language], view=view, nonce=nonce)
+        except discord.NotFound:
+            # The channel was deleted
+            await Guild._update_module_setting_by_id(
+                record.guild_id,
+                "codes",
+                game,
+                "channel",
+                None
+            )
+            return False
+        return True
+
+
+OutboxWorker.register(
+    "codes",
+    BroadcastHandler(
+        module_name="codes",
+        audience=lambda payload: channel_configured("codes", payload["game"]),
+        prepare=CheckCodes._prepare_codes_broadcast,
+    ),
+)
@@ -2,20 +2,35 @@ from __future__ import annotations
 
 import time
 import discord
-from typing import TYPE_CHECKING, ClassVar
+from pymongo import DeleteMany, UpdateMany
+from typing import TYPE_CHECKING, Any, ClassVar
 
 from zenox.embeds import DefaultEmbed
 from zenox.enums import PrintColors
-from zenox.db.mongodb import DB
-from zenox.db.classes import Guild
+from zenox.db.mongodb import DB, versioned
+from zenox.db.classes import Guild, GuildIndex
+from zenox.constants import RECONCILE_BATCH_SIZE, FULL_RECONCILE_INTERVAL
 
 if TYPE_CHECKING:
     from ..bot import Zenox
 
+PENDING_DELETION = "PENDING_DELETION"
+
 
 class CheckDatabase:
+    """Flags guild documents of guilds the bot left and deletes them one check later.
+
+    Joins and removals are applied as they happen through guild_joined / guild_removed. The nightly run then
+    only handles the delta since its last checkpoint: restoring or deleting the flagged guilds and catching
+    removals missed while the bot was offline. A full sweep runs when there is no checkpoint yet and every
+    FULL_RECONCILE_INTERVAL seconds as a safety net.
+
+    In cluster mode every worker only handles the guilds of its own shards and keeps its own checkpoint."""
+
+    _client: ClassVar[Zenox]
     _guilds: ClassVar[set[int]] = set()
     _start: ClassVar[int] = 0
+    _timings: ClassVar[dict[str, float]] = {}
     _results: ClassVar[dict[str, int]] = {
         "skipped": 0,
         "restored": 0,
@@ -27,6 +42,7 @@ class CheckDatabase:
     @classmethod
     async def reset(cls) -> None:
         cls._guilds.clear()
+        cls._timings = {}
         cls._results = {
             "skipped": 0,
             "restored": 0,
@@ -35,46 +51,178 @@ class CheckDatabase:
             "error": 0,
         }
 
+    @classmethod
+    def _batched(cls, guild_ids: list[int]) -> list[list[int]]:
+        return [guild_ids[i:i + RECONCILE_BATCH_SIZE] for i in range(0, len(guild_ids), RECONCILE_BATCH_SIZE)]
+
+    @classmethod
+    def _flag_update(cls, now: int) -> dict[str, Any]:
+        return versioned({"$addToSet": {"flags": PENDING_DELETION}, "$set": {"pending_since": now}})
+
+    @classmethod
+    def _restore_update(cls) -> dict[str, Any]:
+        return versioned({"$pull": {"flags": PENDING_DELETION}, "$unset": {"pending_since": ""}})
+
+    @classmethod
+    def _sync_cache(cls, restore: list[int], flag: list[int], delete: list[int]) -> None:
+        """Applies the flag changes to guilds that happen to be cached, without loading any."""
+        for guild_id in restore:
+            if (guild := Guild.cache.peek(guild_id)) is not None and guild.has_flag(PENDING_DELETION):
+                guild.flags.remove(PENDING_DELETION)
+                guild.version += 1
+        for guild_id in flag:
+            if (guild := Guild.cache.peek(guild_id)) is not None and not guild.has_flag(PENDING_DELETION):
+                guild.flags.append(PENDING_DELETION)
+                guild.version += 1
+        for guild_id in delete:
+            Guild.cache.pop(guild_id)
+            GuildIndex.discard(guild_id)
+
+    @classmethod
+    async def guild_joined(cls, guild_id: int) -> None:
+        """Restores a guild flagged for deletion as soon as the bot is added back."""
+        result = await DB.guilds.update_one({"id": guild_id, "flags": PENDING_DELETION}, cls._restore_update())
+        if result.modified_count:
+            cls._sync_cache([guild_id], [], [])
+            print(f"[CheckDatabase] Info - {PrintColors.OKBLUE}Restored guild {guild_id}{PrintColors.ENDC}")
+
+    @classmethod
+    async def guild_removed(cls, guild_id: int) -> None:
+        """Flags a guild for deletion as soon as the bot is removed."""
+        result = await DB.guilds.update_one(
+            {"id": guild_id, "flags": {"$ne": PENDING_DELETION}}, cls._flag_update(int(time.time()))
+        )
+        if result.modified_count:
+            cls._sync_cache([], [guild_id], [])
+            print(f"[CheckDatabase] Info - {PrintColors.OKBLUE}Flagged guild {guild_id} for deletion{PrintColors.ENDC}")
+
+    @classmethod
+    def _checkpoint_id(cls) -> str:
+        cluster_id = cls._client.config.cluster_id
+        return "check_database" if cluster_id is None else f"check_database:{cluster_id}"
+
+    @classmethod
+    async def _load_checkpoint(cls) -> dict[str, Any] | None:
+        return await DB.cache.find_one({"_id": cls._checkpoint_id()})
+
+    @classmethod
+    async def _save_checkpoint(cls, now: int, *, full: bool) -> None:
+        update: dict[str, Any] = {"checkpoint": now}
+        if full:
+            update["full_sweep_at"] = now
+        await DB.cache.update_one({"_id": cls._checkpoint_id()}, {"$set": update}, upsert=True)
+
+    @classmethod
+    async def _full_sweep(cls, checkpoint: int) -> tuple[list[int], list[int], list[int]]:
+        """Diffs every guild document against the guilds the bot is in."""
+        phase_start = time.perf_counter()
+        db_guilds = await DB.guilds.find({}, {"_id": 0, "id": 1, "flags": 1, "pending_since": 1}).to_list()
+        cls._timings["load"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        restore: list[int] = []
+        flag: list[int] = []
+        delete: list[int] = []
+        for guild_data in db_guilds:
+            if not cls._client.owns_guild(guild_data["id"]):
+                continue
+            pending = PENDING_DELETION in guild_data.get("flags", [])
+            if guild_data["id"] in cls._guilds:  # Bot is in the guild
+                if pending:
+                    restore.append(guild_data["id"])
+                else:
+                    cls._results["skipped"] += 1
+            elif pending:  # Bot is not in the guild
+                if guild_data.get("pending_since", 0) <= checkpoint:  # Flagged before the last check
+                    delete.append(guild_data["id"])
+                else:
+                    cls._results["skipped"] += 1
+            else:
+                flag.append(guild_data["id"])
+        GuildIndex.replace({guild_data["id"] for guild_data in db_guilds})
+        cls._timings["diff"] = time.perf_counter() - phase_start
+        return restore, flag, delete
+
+    @classmethod
+    async def _incremental(cls, checkpoint: int) -> tuple[list[int], list[int], list[int]]:
+        """Diffs only the flagged guilds and the in-memory id index, so the cost scales with churn."""
+        phase_start = time.perf_counter()
+        pending = await DB.guilds.find(
+            {"flags": PENDING_DELETION}, {"_id": 0, "id": 1, "pending_since": 1}
+        ).to_list()
+        known = {guild_id for guild_id in await GuildIndex.load() if cls._client.owns_guild(guild_id)}
+        cls._timings["load"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        restore: list[int] = []
+        delete: list[int] = []
+        pending_ids: set[int] = set()
+        for guild_data in pending:
+            if not cls._client.owns_guild(guild_data["id"]):
+                continue
+            pending_ids.add(guild_data["id"])
+            if guild_data["id"] in cls._guilds:  # Joined again while the event was missed
+                restore.append(guild_data["id"])
+            elif guild_data.get("pending_since", 0) <= checkpoint:  # Flagged before the last check
+                delete.append(guild_data["id"])
+
+        # Removed while the bot was offline
+        flag = list(known - cls._guilds - pending_ids)
+        cls._results["skipped"] = max(0, len(known) - len(restore) - len(delete) - len(flag))
+        cls._timings["diff"] = time.perf_counter() - phase_start
+        return restore, flag, delete
+
     @classmethod
     async def execute(cls, client: Zenox) -> None:
         await cls.reset()
+        cls._client = client
         cls._start = int(time.time())
 
         print(f"[CheckDatabase] Info - {PrintColors.HEADER}Starting database check...{PrintColors.ENDC}")
         for guild in client.guilds:
             cls._guilds.add(guild.id)
 
-        DB_GUILDS = DB.guilds.find({}, {"_id": 0, "id": 1})
+        checkpoint = await cls._load_checkpoint()
+        full = checkpoint is None or cls._start - checkpoint.get("full_sweep_at", 0) >= FULL_RECONCILE_INTERVAL
+        if full:
+            restore, flag, delete = await cls._full_sweep(checkpoint["checkpoint"] if checkpoint else cls._start)
+        else:
+            assert checkpoint is not None
+            restore, flag, delete = await cls._incremental(checkpoint["checkpoint"])
 
-        for guild in await DB_GUILDS.to_list():
+        phase_start = time.perf_counter()
+        operations: list[UpdateMany | DeleteMany] = [
+            *(UpdateMany({"id": {"$in": batch}}, cls._restore_update()) for batch in cls._batched(restore)),
+            *(UpdateMany({"id": {"$in": batch}}, cls._flag_update(cls._start)) for batch in cls._batched(flag)),
+            *(DeleteMany({"id": {"$in": batch}, "flags": PENDING_DELETION}) for batch in cls._batched(delete)),
+        ]
+        if operations:
             try:
-                guild = await Guild.new(guild["id"])
-                if guild.id in cls._guilds:  # Bot is in the guild
-                    if guild.has_flag("PENDING_DELETION"):
-                        await guild._update_flags("PENDING_DELETION", add=False)
-                        cls._results["restored"] += 1
-                        continue
-                    cls._results["skipped"] += 1
-                else:  # Bot is not in the guild
-                    if guild.has_flag("PENDING_DELETION"):
-                        await guild.delete()
-                        cls._results["deleted"] += 1
-                    else:
-                        await guild._update_flags("PENDING_DELETION", add=True)
-                        cls._results["pending"] += 1
+                await DB.guilds.bulk_write(operations, ordered=False)
+                cls._results["restored"] = len(restore)
+                cls._results["pending"] = len(flag)
+                cls._results["deleted"] = len(delete)
+                cls._sync_cache(restore, flag, delete)
             except Exception as e:
-                cls._results["error"] += 1
-                print(f"[CheckDatabase] Error - {PrintColors.FAIL}Exception for guild {guild.id}:{PrintColors.ENDC} {e}")
+                cls._results["error"] = len(restore) + len(flag) + len(delete)
+                print(f"[CheckDatabase] Error - {PrintColors.FAIL}Bulk write failed:{PrintColors.ENDC} {e}")
                 client.capture_exception(e)
+        cls._timings["apply"] = time.perf_counter() - phase_start
+
+        if not cls._results["error"]:
+            await cls._save_checkpoint(cls._start, full=full)
 
-        print(f"[CheckDatabase] Info - {PrintColors.BOLD}Database check completed.{PrintColors.ENDC}")
+        mode = "full" if full else "incremental"
+        timings = ", ".join(f"{phase}: {duration:.3f}s" for phase, duration in cls._timings.items())
+        print(f"[CheckDatabase] Info - {PrintColors.BOLD}Database check completed ({mode}).{PrintColors.ENDC}")
         print(f"[CheckDatabase] Info - {PrintColors.OKBLUE}Results:{PrintColors.ENDC} Skipped: {cls._results['skipped']}, Restored: {cls._results['restored']}, Pending: {cls._results['pending']}, Deleted: {cls._results['deleted']}, Errors: {cls._results['error']}")
+        print(f"[CheckDatabase] Info - {PrintColors.OKBLUE}Timings:{PrintColors.ENDC} {timings}")
 
         if client.config.webhook_url:
             webhook = discord.Webhook.from_url(client.config.webhook_url, client=client)
             embed = DefaultEmbed(
                 locale=discord.Locale.american_english,
-                title="Database Check Completed",
+                title=f"Database Check Completed ({mode})",
                 description=(
                     f"**Skipped:** {cls._results['skipped']}\n"
                     f"**Restored:** {cls._results['restored']}\n"
@@ -83,5 +231,5 @@ class CheckDatabase:
                     f"**Errors:** {cls._results['error']}\n"
                 ),
             )
-            embed.set_footer(text=f"Time: {round(time.time() - cls._start, 3)} seconds")
+            embed.set_footer(text=f"Time: {round(time.time() - cls._start, 3)} seconds ({timings})")
             await webhook.send(embed=embed, username="Zenox Database Checker")
@@ -2,29 +2,33 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import itertools
 from typing import TYPE_CHECKING, ClassVar
 
-import discord
-
-from zenox.db.mongodb import DB
-from zenox.db.classes import Guild, Video
+from zenox.db.mongodb import DB, channel_configured
+from zenox.db.classes import DeliveryRecord, Guild, Video
 from zenox.ui.components import URLButtonView
 from zenox.enums import Game, PrintColors
-from zenox.constants import GAME_YOUTUBE_CHANNEL_ID
-from zenox.clients.ytb import YTBClient, VideoDetails
+from zenox.constants import GAME_YOUTUBE_CHANNEL_ID, YTB_NOT_FOUND_RETRIES, YTB_POLL_FALLBACK_MINUTES, YTB_POLL_MAX_MINUTES, YTB_POLL_MINUTES
+from zenox.clients.breaker import CircuitOpenError
+from zenox.clients.quota import YOUTUBE_QUOTA
+from zenox.clients.ytb import VIDEOS_LIST_MAX_IDS, YTBClient, VideoDetails
 from zenox.l10n import LocaleStr, translator
+from zenox.delivery import SCHEDULER, SEND_MESSAGE, resolve_messageable, role_mention
 
 if TYPE_CHECKING:
     from ..bot import Zenox
 
 """Strategy
-1. Loop through Games
-2. For each game, fetch RSS-Feed of its YouTube Channel
-3. Check Database through a RAW Query if video_id exists
-4. Get Video Details from YouTube API
-5. If video is a upcoming Livestream, schedule a Stream for all Guilds and internally in the Bots Database
-6. If it's a normal video, notify all Guilds that have Notifications enabled for that Game
-7. If not, create a new entry using zenox.db.classes.videos.Video
+0. With WebSub enabled, pushed video ids enter at step 2 and the polling below only runs as a slow fallback
+1. Fetch the RSS-Feeds of the YouTube Channels of all Games
+2. Per Game, check which video_ids already exist through a single $in Query
+3. Get Video Details of every unseen video from the YouTube API, up to 50 per request.
+   The quota ledger decides how many requests a run may make, the rest waits for the next run
+4. If video is a upcoming Livestream, schedule a Stream for all Guilds and internally in the Bots Database
+5. If it's a normal video, notify all Guilds that have Notifications enabled for that Game
+6. If not, create a new entry using zenox.db.classes.videos.Video
+7. Derive the interval until the next run from the quota left today
 
 """
 
@@ -32,7 +36,24 @@ class YTBMonitor:
     _after_date: datetime.datetime = datetime.datetime(2026, 3, 15, 0, 0, 0) # Avoid backfill of old videos
     _client: ClassVar[Zenox]
     _lock: ClassVar[asyncio.Lock] = asyncio.Lock()
-    
+    # Videos resolved but never stored (old, past livestreams, not found), so they are not looked up again.
+    # Pruned to the ids still in the feeds every run.
+    _ignored: ClassVar[set[str]] = set()
+    # Lookups of ids videos.list did not know yet, ignored after YTB_NOT_FOUND_RETRIES runs
+    _not_found: ClassVar[dict[str, int]] = {}
+    # Newest stored video per game. Feeds list the newest first, so parsing stops there on the next run
+    _stop_at: ClassVar[dict[Game, str]] = {}
+    pushes_enabled: ClassVar[bool] = False
+    """Set by the WebSub cog once its receiver runs"""
+    PUSHED_DOCUMENT_ID: ClassVar[str] = "websub_pushed_videos"
+    interval: ClassVar[float] = YTB_POLL_MINUTES * 60
+    """Seconds until the next poll, stretched when the quota runs low"""
+
+    @classmethod
+    def _base_interval(cls) -> float:
+        # With WebSub, new videos are pushed and polling only catches what the hub missed
+        return (YTB_POLL_FALLBACK_MINUTES if cls.pushes_enabled else YTB_POLL_MINUTES) * 60
+
     @classmethod
     async def execute(cls, client: Zenox) -> None:
         if cls._lock.locked():
@@ -41,35 +62,137 @@ class YTBMonitor:
         
         async with cls._lock:
             cls._client = client
-            ytbclient = YTBClient(client)
+            ytbclient = YTBClient(client, YOUTUBE_QUOTA)
+            await YOUTUBE_QUOTA.load()  # Other processes may have spent units since
+            plan = YOUTUBE_QUOTA.plan(cls._base_interval(), YTB_POLL_MAX_MINUTES * 60)
+
+            candidates: dict[Game, list[str]] = {}
             for game in Game:
-                feed = await ytbclient.get_recent_channel_videos_rss(
-                    GAME_YOUTUBE_CHANNEL_ID[game]
-                )
-                for entry in feed["entries"]:
-                    if any("shorts" in link["href"] for link in entry["links"]):
-                        continue
-                    db_res = await DB.videos.find_one({"video_id": entry["yt_videoid"], "game": game.value})
-                    if db_res is not None:
-                        continue  # Video already processed
-                    videos = await ytbclient.get_video_details(entry["yt_videoid"])
-                    if videos is None:
-                        continue # Video not found
-                    elif videos[0]["snippet"]["publishedAt"] < cls._after_date.isoformat() + "Z":
-                        continue  # Video is older than after_date
-                    elif videos[0]["snippet"]["liveBroadcastContent"] == "upcoming" and videos[0].get("liveStreamingDetails") is not None:
-                        """Upcoming Livestream, might be replaced by Twitch Monitor"""
-                        await cls.schedule_stream(videos[0])
-                    elif videos[0]["snippet"]["liveBroadcastContent"] == "none" and videos[0].get("liveStreamingDetails") is not None:
-                        """Past Livestream, ignore"""
-                        continue
-                    elif videos[0]["snippet"]["liveBroadcastContent"] == "none" and videos[0].get("liveStreamingDetails") is None:
-                        """Normal Video"""
-                        await cls.notify_video(videos[0], game)
+                try:
+                    feed = await ytbclient.get_recent_channel_videos_rss(
+                        GAME_YOUTUBE_CHANNEL_ID[game],
+                        stop_at={cls._stop_at[game]} if game in cls._stop_at else (),
+                    )
+                except CircuitOpenError as e:
+                    print(f"[YTBMonitor] Warning - {PrintColors.WARNING}Skipping YouTube feeds: {e}{PrintColors.ENDC}")
+                    return
+                candidates[game] = [
+                    entry["yt_videoid"]
+                    for entry in feed["entries"]
+                    if not any("shorts" in link["href"] for link in entry["links"])
+                ]
+            in_feeds = {video_id for video_ids in candidates.values() for video_id in video_ids}
+            cls._ignored &= in_feeds
+            cls._not_found = {video_id: misses for video_id, misses in cls._not_found.items() if video_id in in_feeds}
+            stored, deferred = await cls._process(ytbclient, candidates, plan.max_calls)
+            for game, video_ids in candidates.items():
+                # Parsing must not stop above a deferred video, it would never be read again
+                start = max((i + 1 for i, video_id in enumerate(video_ids) if video_id in deferred), default=0)
+                newest = next((video_id for video_id in video_ids[start:] if video_id in stored), None)
+                if newest is not None:
+                    cls._stop_at[game] = newest
+
+            interval = YOUTUBE_QUOTA.plan(cls._base_interval(), YTB_POLL_MAX_MINUTES * 60).interval
+            if interval != cls.interval:
+                print(f"[YTBMonitor] Info - {PrintColors.OKCYAN}Polling every {interval / 60:.1f} minutes, {YOUTUBE_QUOTA.remaining} quota units left today.{PrintColors.ENDC}")
+            cls.interval = interval
+
+    @classmethod
+    async def handle_push(cls, client: Zenox, game: Game, video_ids: list[str]) -> None:
+        """Entry point for WebSub push notifications. Waits for a running poll instead of skipping."""
+        async with cls._lock:
+            cls._client = client
+            try:
+                await YOUTUBE_QUOTA.load()  # Other processes may have spent units since
+                plan = YOUTUBE_QUOTA.plan(cls._base_interval(), YTB_POLL_MAX_MINUTES * 60, use_reserve=True)
+                await cls._process(YTBClient(client, YOUTUBE_QUOTA), {game: video_ids}, plan.max_calls)
+            except Exception as e:
+                print(f"[YTBMonitor] Error - {PrintColors.FAIL}Failed to handle pushed videos {video_ids}:{PrintColors.ENDC} {e}")
+                client.capture_exception(e)
+
+    @classmethod
+    async def store_push(cls, game: Game, video_ids: list[str]) -> None:
+        """Keeps videos pushed to a standby replica in DB.cache, the leader handles them on its next tick."""
+        await DB.cache.update_one(
+            {"_id": cls.PUSHED_DOCUMENT_ID},
+            {"$addToSet": {f"videos.{game.value}": {"$each": video_ids}}},
+            upsert=True,
+        )
+
+    @classmethod
+    async def handle_stored_pushes(cls, client: Zenox) -> None:
+        """Handles the videos standby replicas stored. Taken out atomically, so each push is handled once."""
+        data = await DB.cache.find_one_and_delete({"_id": cls.PUSHED_DOCUMENT_ID})
+        if data is None:
+            return
+        for game_value, video_ids in data.get("videos", {}).items():
+            print(f"[YTBMonitor] Info - {PrintColors.OKCYAN}Handling videos {video_ids} pushed to a standby replica.{PrintColors.ENDC}")
+            await cls.handle_push(client, Game(game_value), video_ids)
+
+    @classmethod
+    async def _process(cls, ytbclient: YTBClient, candidates: dict[Game, list[str]], max_calls: int) -> tuple[set[str], set[str]]:
+        """Notifies about the new videos among candidates, resolving at most max_calls batches of them.
+        Returns the ids that are stored afterwards and the ids deferred to a later run, including the ones
+        videos.list did not find yet."""
+        unseen: dict[Game, list[str]] = {}
+        stored: set[str] = set()
+        for game, video_ids in candidates.items():
+            if not video_ids:
+                continue
+            existing = await Video.existing_ids(video_ids, game)
+            stored |= existing
+            unseen[game] = [video_id for video_id in video_ids if video_id not in existing and video_id not in cls._ignored]
+
+        # Newest video of every game first, so a small budget is shared fairly
+        video_ids = [video_id for batch in itertools.zip_longest(*unseen.values()) for video_id in batch if video_id is not None]
+        limit = max_calls * VIDEOS_LIST_MAX_IDS
+        deferred = set(video_ids[limit:])
+        video_ids = video_ids[:limit]
+        if deferred:
+            print(f"[YTBMonitor] Warning - {PrintColors.WARNING}Quota allows {max_calls} videos.list calls, deferring {len(deferred)} videos.{PrintColors.ENDC}")
+        if not video_ids:
+            return stored, deferred
+        details = await ytbclient.get_videos_details(video_ids)
+        print(f"[YTBMonitor] Info - {PrintColors.OKCYAN}Resolved {len(video_ids)} unseen videos, {len(details)} found.{PrintColors.ENDC}")
+
+        for game, game_video_ids in unseen.items():
+            for video_id in game_video_ids:
+                if video_id in deferred:
+                    continue
+                video = details.get(video_id)
+                if video is None:
+                    # Fresh uploads and premieres can be missing from videos.list for a while, look again next run
+                    misses = cls._not_found.get(video_id, 0) + 1
+                    if misses >= YTB_NOT_FOUND_RETRIES:
+                        cls._not_found.pop(video_id, None)
+                        cls._ignored.add(video_id)
                     else:
-                        print(f"[YTBMonitor] Error - {PrintColors.FAIL}Unknown Video type:{PrintColors.ENDC} {videos[0]}")
-                    
-                    await asyncio.sleep(3)
+                        cls._not_found[video_id] = misses
+                        deferred.add(video_id)
+                    continue # Video not found
+                cls._not_found.pop(video_id, None)
+                if video["snippet"].get("channelId") != GAME_YOUTUBE_CHANNEL_ID[game]:
+                    # Pushed ids are only as trustworthy as the push, never announce another channel's video
+                    print(f"[YTBMonitor] Warning - {PrintColors.WARNING}Video {video_id} belongs to channel {video['snippet'].get('channelId')}, not to {game.value}, ignoring.{PrintColors.ENDC}")
+                    cls._ignored.add(video_id)
+                    continue
+                if video["snippet"]["publishedAt"] < cls._after_date.isoformat() + "Z":
+                    cls._ignored.add(video_id)
+                    continue  # Video is older than after_date
+                elif video["snippet"]["liveBroadcastContent"] == "upcoming" and video.get("liveStreamingDetails") is not None:
+                    """Upcoming Livestream, might be replaced by Twitch Monitor"""
+                    await cls.schedule_stream(video)
+                elif video["snippet"]["liveBroadcastContent"] == "none" and video.get("liveStreamingDetails") is not None:
+                    """Past Livestream, ignore"""
+                    cls._ignored.add(video_id)
+                    continue
+                elif video["snippet"]["liveBroadcastContent"] == "none" and video.get("liveStreamingDetails") is None:
+                    """Normal Video"""
+                    await cls.notify_video(video, game)
+                    stored.add(video_id)
+                else:
+                    print(f"[YTBMonitor] Error - {PrintColors.FAIL}Unknown Video type:{PrintColors.ENDC} {video}")
+        return stored, deferred
     
     @classmethod
     async def schedule_stream(cls, video_data: VideoDetails) -> None:
@@ -79,54 +202,55 @@ class YTBMonitor:
 
     @classmethod
     async def notify_video(cls, video_data: VideoDetails, game: Game) -> None:
-        """Notifies all guilds about a new video."""
+        """Notifies all guilds about a new video. The video is stored first and only the process that stored
+        it notifies, so a replica still running after losing the lease cannot announce it a second time.
+        A crash halfway through leaves the remaining guilds without the notification."""
+        if not await Video.claim(video_id=video_data["id"], game=game, title=video_data["snippet"]["title"]):
+            print(f"[YTBMonitor] Info - {PrintColors.OKCYAN}Video {video_data['id']} was already stored by another process, skipping.{PrintColors.ENDC}")
+            return
         print(f"[YTBMonitor] Info - {PrintColors.OKGREEN}Notifying guilds about new video:{PrintColors.ENDC} {video_data['id']}")
 
-        notifies = DB.guilds.find({f"youtube_notifications.{game.value}.channel": {"$ne": None}}, {"_id": 0, "id": 1})
-        async for guild_data in notifies:
+        notifies = DeliveryRecord.find(
+            "youtube_notifications",
+            game,
+            channel_configured("youtube_notifications", game.value),
+        )
+        async for record in notifies:
             try:
-                role = None
-                guild = await Guild.new(guild_data["id"])
+                mention = None
 
-                channel_id = guild.youtube_notifications[game].channel
+                channel_id = record.channel
                 if channel_id is None:
                     continue
 
-                channel = cls._client.get_channel(channel_id) or await cls._client.fetch_channel(channel_id)
+                channel = resolve_messageable(cls._client, channel_id, record.guild_id)
 
-                if not channel or not isinstance(channel, (discord.TextChannel, discord.Thread)):
+                if not channel:
                     continue
 
-                
-                role_id = guild.youtube_notifications[game].mention_role
+                role_id = record.mention_role
                 if role_id is not None:
-                    guild_obj = cls._client.get_guild(guild.id) or await cls._client.fetch_guild(guild.id)
-                    role = guild_obj.get_role(role_id)
-                
-                if not role:
-                    # Update DB to remove invalid role
-                    await guild._update_module_setting(
-                        "youtube_notifications",
-                        game,
-                        "mention_role",
-                        None
-                    )
-                
-                view = URLButtonView(guild.language, url=f"https://youtu.be/{video_data['id']}", label=LocaleStr(key="ytb_notification.watch_button.label"))
+                    mention = role_mention(cls._client, record.guild_id, role_id)
+
+                    if not mention:
+                        # Update DB to remove invalid role
+                        await Guild._update_module_setting_by_id(
+                            record.guild_id,
+                            "youtube_notifications",
+                            game,
+                            "mention_role",
+                            None
+                        )
+
+                view = URLButtonView(record.language, url=f"https://youtu.be/{video_data['id']}", label=LocaleStr(key="ytb_notification.watch_button.label"))
 
                 msg = translator.translate(
                     LocaleStr(key="ytb_notification.content", channel=video_data["snippet"]["channelTitle"], url=f"https://youtu.be/{video_data['id']}"),
-                    locale=guild.language,
+                    locale=record.language,
                 )
-                send_msg = f"{role.mention + ' ' if role else ''}{'@everyone' + ' ' if guild.youtube_notifications[game].mention_everyone else ''}{msg}"
-                await channel.send(send_msg, view=view)
+                send_msg = f"{mention + ' ' if mention else ''}{'@everyone' + ' ' if record.mention_everyone else ''}{msg}"
+                async with SCHEDULER.acquire(SEND_MESSAGE, channel_id):
+                    await channel.send(send_msg, view=view)
             except Exception as e:
                 cls._client.capture_exception(e)
-
-        # Finally, add video to database
-        await Video.new(
-            video_id=video_data["id"],
-            game=game,
-            title=video_data["snippet"]["title"],
-        )
     
\ No newline at end of file
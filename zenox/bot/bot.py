@@ -8,7 +8,7 @@ import concurrent.futures
 from discord.ext import commands
 from aiohttp import ClientSession
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 from .command_tree import CommandTree
 from zenox.l10n import AppCommandTranslator
@@ -16,7 +16,11 @@ from zenox.utils import get_now, get_repo_version
 from zenox.enums import PrintColors
 from zenox.constants import POOL_MAX_WORKERS
 from zenox.config import Config
-from zenox.db.classes import ModuleConfig
+from zenox.db.mongodb import DB
+from zenox.db.classes import ModuleConfig, RedemptionCode
+from zenox.db.leader import LeaderLease
+from zenox.db.watcher import CacheWatcher
+from zenox.clients.http import HTTPClient
 
 
 class Zenox(commands.AutoShardedBot):
@@ -28,10 +32,18 @@ class Zenox(commands.AutoShardedBot):
         self.version = get_repo_version()
         self.env = config.env
         self.process = psutil.Process()
+        self.http_client = HTTPClient()
         self.session: Optional[ClientSession] = None
         self.config = config
         # Add Module Configurations from db/classes/config.py
         self.db_config: Optional[ModuleConfig] = None
+        self.cache_watcher: Optional[CacheWatcher] = None
+        self.leader: Optional[LeaderLease] = None
+
+        # Cluster workers only connect their own shard range
+        shard_options: dict[str, Any] = {}
+        if config.shard_ids:
+            shard_options = {"shard_ids": config.shard_ids, "shard_count": config.shard_count}
 
         super().__init__(
             command_prefix=commands.when_mentioned,
@@ -46,6 +58,7 @@ class Zenox(commands.AutoShardedBot):
                 guild=True, user=False
             ),
             activity=discord.CustomActivity(f"{self.version} | Zenox"),
+            **shard_options,
         )
 
         if config.env == "dev":
@@ -58,12 +71,30 @@ class Zenox(commands.AutoShardedBot):
             )
 
     async def setup_hook(self) -> None:
-        self.session = ClientSession()
+        # Shares the pooled connector of the HTTP client, e.g. for webhooks
+        self.session = self.http_client.session
 
         # Load global configuration from database
         self.db_config = await ModuleConfig.new()
         print(f"[Zenox] Info - {PrintColors.OKCYAN}Loaded DB config.{PrintColors.ENDC}")
 
+        await DB.ensure_indexes()
+        print(f"[Zenox] Info - {PrintColors.OKCYAN}Ensured DB indexes.{PrintColors.ENDC}")
+
+        await RedemptionCode.warm()
+        print(f"[Zenox] Info - {PrintColors.OKCYAN}Loaded published codes.{PrintColors.ENDC}")
+
+        if self.config.schedule or self.config.cluster_id is not None:
+            # Every replica may run with --schedule, only the lease holder runs the jobs.
+            # Cluster workers without the schedule still reconcile the guilds of their shards, one lease per worker
+            self.leader = LeaderLease(self, "schedule" if self.config.schedule else f"cluster:{self.config.cluster_id}")
+            self.leader.start()
+
+        if self.config.cache_watcher or self.leader is not None:
+            # Commands and buttons write db_config in whichever process handled them, the jobs may run in another one
+            self.cache_watcher = CacheWatcher(self)
+            self.cache_watcher.start()
+
         # Set translator
         await self.tree.set_translator(AppCommandTranslator())
         print(f"[Zenox] Info - {PrintColors.OKCYAN}Translator set.{PrintColors.ENDC}")
@@ -81,8 +112,11 @@ class Zenox(commands.AutoShardedBot):
 
     async def close(self) -> None:
         print(f"[Zenox] Warning - {PrintColors.WARNING}Shutting down Zenox bot...{PrintColors.ENDC}")
-        if self.session:
-            await self.session.close()
+        if self.leader:
+            await self.leader.stop()
+        await self.http_client.close()
+        if self.cache_watcher:
+            self.cache_watcher.stop()
         return await super().close()
 
     def capture_exception(self, error: Exception) -> None:
@@ -90,6 +124,17 @@ class Zenox(commands.AutoShardedBot):
             return
         sentry_sdk.capture_exception(error)
 
+    @property
+    def is_primary(self) -> bool:
+        """Whether this process does the bot-wide work that must not run once per cluster worker."""
+        return self.config.cluster_id in (None, 0)
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether the guild is on one of this process' shards. Always True outside cluster mode."""
+        if self.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
     @property
     def ram_usage(self) -> float:
         return self.process.memory_info().rss / 1024**2
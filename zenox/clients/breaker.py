@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time
+from typing import ClassVar
+
+from zenox.enums import CircuitState, PrintColors
+from zenox.metrics import CIRCUIT_STATE_GAUGE
+
+__all__ = ("CircuitBreaker", "CircuitOpenError")
+
+# Gauge values, ordered by severity
+STATE_VALUES: dict[CircuitState, int] = {
+    CircuitState.CLOSED: 0,
+    CircuitState.HALF_OPEN: 1,
+    CircuitState.OPEN: 2,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an upstream whose circuit is open."""
+
+    def __init__(self, upstream: str, retry_in: float) -> None:
+        super().__init__(f"Circuit for {upstream} is open, retrying in {retry_in:.0f}s")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after failure_threshold consecutive failures.
+
+    While open, requests fail fast with CircuitOpenError. After recovery_timeout seconds a single probe is
+    let through (half-open): success closes the circuit, failure opens it again."""
+
+    _breakers: ClassVar[dict[str, CircuitBreaker]] = {}
+
+    def __init__(self, upstream: str, *, failure_threshold: int = 5, recovery_timeout: float = 60) -> None:
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        CIRCUIT_STATE_GAUGE.labels(upstream).set(STATE_VALUES[self.state])
+
+    @classmethod
+    def get(cls, upstream: str) -> CircuitBreaker:
+        """Returns the breaker of an upstream, shared by every caller of it."""
+        if upstream not in cls._breakers:
+            cls._breakers[upstream] = CircuitBreaker(upstream)
+        return cls._breakers[upstream]
+
+    def _set_state(self, state: CircuitState) -> None:
+        if state is self.state:
+            return
+        self.state = state
+        CIRCUIT_STATE_GAUGE.labels(self.upstream).set(STATE_VALUES[state])
+        color = PrintColors.OKGREEN if state is CircuitState.CLOSED else PrintColors.WARNING
+        print(f"[CircuitBreaker] Info - {color}Circuit for {self.upstream} is now {state.value}.{PrintColors.ENDC}")
+
+    def before_request(self) -> None:
+        """Raises CircuitOpenError if the request must not be sent."""
+        if self.state is CircuitState.CLOSED:
+            return
+        retry_in = self._opened_at + self.recovery_timeout - time.monotonic()
+        if self.state is CircuitState.OPEN and retry_in <= 0:
+            self._set_state(CircuitState.HALF_OPEN)
+        if self.state is CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(self.upstream, max(retry_in, 0))
+
+    def cancel_probe(self) -> None:
+        """Lets the next request probe again when a probe was cancelled before it got an answer."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self._set_state(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self.state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(CircuitState.OPEN)
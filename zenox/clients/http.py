@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from zenox.enums import PrintColors
+from .breaker import CircuitBreaker
+from zenox.metrics import HTTP_ERROR_COUNTER, HTTP_REQUEST_HISTOGRAM, HTTP_RETRY_COUNTER
+
+__all__ = ("HTTPClient", "HTTPResponse", "RetryBudget")
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(slots=True)
+class HTTPResponse:
+    """A fully read response. The connection is already back in the pool when this is handed out."""
+    url: str
+    status: int
+    headers: CIMultiDictProxy[str]
+    body: bytes
+    encoding: str
+    request_info: aiohttp.RequestInfo
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(self.request_info, (), status=self.status, headers=self.headers)
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors="replace")
+
+
+class RetryBudget:
+    """Caps retries at a fraction of the recent request volume, shared by every upstream.
+
+    Each request deposits ratio tokens and each retry withdraws one, so a failing upstream cannot
+    multiply the outgoing traffic. Starting full keeps a few retries available when traffic is low."""
+
+    def __init__(self, *, ratio: float = 0.2, max_tokens: float = 20) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class HTTPClient:
+    """The HTTP layer every outgoing request of the bot goes through.
+
+    One pooled session with per-host connection limits and DNS caching, total and connect timeouts, bodies
+    read inside the request so connections are released immediately, and exponential backoff with jitter for
+    connection errors, timeouts and 429/5xx responses, bounded by a shared RetryBudget.
+
+    Every host has a CircuitBreaker: once it keeps failing (connection errors, timeouts or 5xx after the
+    retries), requests to it raise CircuitOpenError right away until a half-open probe succeeds."""
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        total_timeout: float = 30,
+        connect_timeout: float = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget or RetryBudget()
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The pooled session, for APIs that need one directly (e.g. discord.Webhook)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after is not None:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass  # HTTP date, fall back to the computed delay
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        params: Mapping[str, str] | None = None,
+        data: Mapping[str, str] | None = None,
+        retry: bool = True,
+    ) -> HTTPResponse:
+        """Sends a request and reads the whole body. Retryable failures are retried up to max_retries times;
+        other statuses are returned as is, call raise_for_status to turn them into errors.
+        Raises CircuitOpenError without sending anything while the circuit of the host is open."""
+        host = urlsplit(url).hostname or "unknown"
+        breaker = CircuitBreaker.get(host)
+        breaker.before_request()
+        try:
+            return await self._send(method, url, host, breaker, headers=headers, params=params, data=data, retry=retry)
+        except asyncio.CancelledError:
+            # Cancelled before an answer, e.g. by a timeout, so the next request may probe again
+            breaker.cancel_probe()
+            raise
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        host: str,
+        breaker: CircuitBreaker,
+        *,
+        headers: Mapping[str, str] | None,
+        params: Mapping[str, str] | None,
+        data: Mapping[str, str] | None,
+        retry: bool,
+    ) -> HTTPResponse:
+        attempt = 0
+        self.budget.deposit()
+        while True:
+            start = time.perf_counter()
+            retry_after: str | None = None
+            try:
+                async with self.session.request(method, url, headers=headers, params=params, data=data) as response:
+                    body = await response.read()
+                    result = HTTPResponse(
+                        url=str(response.url),
+                        status=response.status,
+                        headers=response.headers,
+                        body=body,
+                        encoding=response.get_encoding(),
+                        request_info=response.request_info,
+                    )
+                HTTP_REQUEST_HISTOGRAM.labels(host, str(result.status)).observe(time.perf_counter() - start)
+                if result.status not in RETRYABLE_STATUSES:
+                    breaker.record_success()
+                    return result
+                HTTP_ERROR_COUNTER.labels(host, str(result.status)).inc()
+                retry_after = result.headers.get("Retry-After")
+                error: Exception | None = None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "connection"
+                HTTP_ERROR_COUNTER.labels(host, reason).inc()
+                result = None
+                error = e
+            except Exception:
+                # Anything else (e.g. a broken payload) ends the request without an answer. Counting it as a failure
+                # also releases a half-open probe, which would otherwise keep the circuit closed to every request.
+                HTTP_ERROR_COUNTER.labels(host, "error").inc()
+                breaker.record_failure()
+                raise
+
+            if not retry or attempt >= self.max_retries or not self.budget.withdraw():
+                if error is not None or result is None or result.status >= 500:
+                    breaker.record_failure()
+                else:  # 429, the host is up but throttling us
+                    breaker.record_success()
+                if error is not None:
+                    raise error
+                assert result is not None
+                return result
+
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            HTTP_RETRY_COUNTER.labels(host).inc()
+            print(f"[HTTPClient] Warning - {PrintColors.WARNING}Retrying {method} {host} in {delay:.1f}s (attempt {attempt}/{self.max_retries}).{PrintColors.ENDC}")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs: Any) -> HTTPResponse:
+        return await self.request("GET", url, **kwargs)
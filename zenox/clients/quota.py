@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import datetime
+import math
+from dataclasses import dataclass
+
+from pymongo import ReturnDocument
+
+from zenox.constants import YOUTUBE_DAILY_QUOTA, YOUTUBE_QUOTA_RESERVE, YOUTUBE_QUOTA_TZ
+from zenox.db.mongodb import DB
+from zenox.enums import PrintColors
+from zenox.metrics import QUOTA_REMAINING_GAUGE, QUOTA_UNITS_COUNTER
+
+__all__ = ("QuotaLedger", "QuotaPlan", "YOUTUBE_QUOTA")
+
+
+@dataclass(slots=True, frozen=True)
+class QuotaPlan:
+    """How often to poll and how many API calls one run may make."""
+    interval: float
+    max_calls: int
+
+
+class QuotaLedger:
+    """Counts the units spent on an API with a daily quota.
+
+    The count lives in one DB.cache document, so restarts and other processes share it. It starts over when
+    the quota day changes (midnight Pacific Time for YouTube). plan() spreads the remaining budget over the
+    rest of the day. `reserve` units stay set aside for pushed videos and manual lookups."""
+
+    def __init__(self, name: str, *, daily_limit: int, reserve: int, tz: datetime.tzinfo) -> None:
+        self.name = name
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self.tz = tz
+        self._day = ""
+        self._used = 0
+
+    @property
+    def document_id(self) -> str:
+        return f"{self.name}_quota"
+
+    def _today(self) -> str:
+        return datetime.datetime.now(self.tz).date().isoformat()
+
+    def seconds_until_reset(self) -> float:
+        now = datetime.datetime.now(self.tz)
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time.min, tzinfo=self.tz)
+        # Through timestamps, subtracting datetimes of the same zone ignores a DST change in between
+        return midnight.timestamp() - now.timestamp()
+
+    @property
+    def used(self) -> int:
+        return self._used if self._day == self._today() else 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.daily_limit - self.used)
+
+    def _set_used(self, day: str, used: int) -> None:
+        self._day = day
+        self._used = used
+        QUOTA_REMAINING_GAUGE.labels(self.name).set(self.remaining)
+
+    async def load(self) -> None:
+        """Reads today's count, e.g. after a restart."""
+        today = self._today()
+        data = await DB.cache.find_one({"_id": self.document_id})
+        self._set_used(today, data["units"] if data is not None and data.get("day") == today else 0)
+
+    async def spend(self, method: str, units: int) -> None:
+        """Records units charged for a call. Other processes' spending is picked up from the returned count."""
+        today = self._today()
+        QUOTA_UNITS_COUNTER.labels(self.name, method).inc(units)
+        data = await DB.cache.find_one_and_update(
+            {"_id": self.document_id},
+            [{"$set": {
+                "units": {"$cond": [{"$eq": ["$day", today]}, {"$add": [{"$ifNull": ["$units", 0]}, units]}, units]},
+                "day": today,
+            }}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        assert data is not None  # upserted
+        previous = self.remaining
+        self._set_used(today, data["units"])
+        if previous > self.reserve >= self.remaining:
+            print(f"[QuotaLedger] Warning - {PrintColors.WARNING}{self.name} quota down to its reserve of {self.reserve} units.{PrintColors.ENDC}")
+
+    def plan(self, base_interval: float, max_interval: float, *, use_reserve: bool = False) -> QuotaPlan:
+        """Spreads the budget left today over the polls until the reset, one unit per call.
+
+        Polls run every base_interval seconds while there is at least one call per poll. Otherwise the
+        interval is stretched up to max_interval. Without budget, polls keep running at max_interval so the
+        feeds are still read, but no calls are made."""
+        budget = self.remaining if use_reserve else self.remaining - self.reserve
+        until_reset = self.seconds_until_reset()
+        if budget <= 0:
+            return QuotaPlan(interval=max_interval, max_calls=0)
+
+        per_run = budget * base_interval / until_reset
+        if per_run >= 1:
+            return QuotaPlan(interval=base_interval, max_calls=min(budget, math.floor(per_run)))
+        return QuotaPlan(interval=min(max_interval, until_reset / budget), max_calls=1)
+
+
+YOUTUBE_QUOTA = QuotaLedger("youtube", daily_limit=YOUTUBE_DAILY_QUOTA, reserve=YOUTUBE_QUOTA_RESERVE, tz=YOUTUBE_QUOTA_TZ)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, TypedDict, cast
+from typing import TYPE_CHECKING, ClassVar, TypedDict, cast
+
+from zenox.clients.breaker import CircuitOpenError
+from zenox.utils.cache import LRUCache
 
 if TYPE_CHECKING:
     from zenox.bot.bot import Zenox
@@ -24,6 +27,9 @@ class SeelelandLeaderboardData(TypedDict, total=False):
 class SLClient:
     """A Client for interacting with Seeleland API"""
 
+    # Last good response per UID, served while the Seeleland circuit is open
+    _last_good: ClassVar[LRUCache[str, SeelelandResponse]] = LRUCache("seeleland", maxsize=1000, ttl=24 * 3600)
+
     def __init__(self, client: Zenox) -> None:
         self.client = client
         self.base_url = client.config.seeleland_api_url
@@ -31,12 +37,16 @@ class SLClient:
     async def get_player_data(self, uid: str) -> SeelelandResponse:
         """Fetch player data from Seeleland API by UID"""
 
-        assert self.client.session is not None, "Client session is not initialized"
-
         url = self.base_url + f"/getPlayer?uid={uid}"
-        response = await self.client.session.get(url)
+        try:
+            response = await self.client.http_client.get(url)
+        except CircuitOpenError:
+            cached = self._last_good.get(uid)
+            if cached is None:
+                raise
+            return cached
         response.raise_for_status()
-        data = await response.json()
+        data = response.json()
 
         # Extract account data (k="p") and leaderboard data from characters
         account = cast(AccountData, next((item for item in data if item.get("k") == "p"), {}))
@@ -51,4 +61,6 @@ class SLClient:
             }
         )
 
-        return SeelelandResponse(account=account, leaderboard=leaderboard)
\ No newline at end of file
+        result = SeelelandResponse(account=account, leaderboard=leaderboard)
+        self._last_good.set(uid, result)
+        return result
\ No newline at end of file
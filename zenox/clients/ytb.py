@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-import googleapiclient.discovery
-from typing import TYPE_CHECKING, TypedDict, List, cast, Required, Dict
+import asyncio
+import xml.etree.ElementTree as ET
+from typing import TYPE_CHECKING, Collection, TypedDict, List, cast, Required, Dict
 from feedparser import parse
 
 if TYPE_CHECKING:
     from zenox.bot.bot import Zenox
+    from .quota import QuotaLedger
 
-API_SERVICE_NAME: str = "youtube"
-API_VERSION: str = "v3"
+VIDEOS_LIST_URL: str = "https://www.googleapis.com/youtube/v3/videos"
+VIDEOS_LIST_MAX_IDS: int = 50
+
+ATOM_NS: str = "{http://www.w3.org/2005/Atom}"
+YT_NS: str = "{http://www.youtube.com/xml/schemas/2015}"
+PARSE_CHUNK_SIZE: int = 16 * 1024
 
 class RSSEntryLinks(TypedDict, total=False):
     href: Required[str]
@@ -60,30 +66,104 @@ class VideoLiveStreamingDetails(TypedDict, total=False):
     actualEndTime: str
     scheduledStartTime: str
 
+class VideoListResponse(TypedDict, total=False):
+    kind: str
+    etag: str
+    items: List[VideoDetails]
+
+def parse_feed_streaming(xml: bytes, stop_at: Collection[str] = ()) -> RSSFeed:
+    """Pulls only video id, title and links out of a channel feed, entry by entry.
+
+    Feeds list the newest video first, so parsing stops at the first id in stop_at and the rest of the
+    document is never read. Blocking, run it off the event loop."""
+    parser = ET.XMLPullParser(events=("end",))
+    entries: List[RSSEntry] = []
+    for i in range(0, len(xml), PARSE_CHUNK_SIZE):
+        parser.feed(xml[i:i + PARSE_CHUNK_SIZE])
+        for event in parser.read_events():
+            element = event[-1]
+            if not isinstance(element, ET.Element) or element.tag != f"{ATOM_NS}entry":
+                continue
+            video_id = element.findtext(f"{YT_NS}videoId")
+            if video_id is None:
+                continue
+            if video_id in stop_at:
+                return RSSFeed(entries=entries, feed={})
+            entries.append(RSSEntry(
+                yt_videoid=video_id,
+                title=element.findtext(f"{ATOM_NS}title", ""),
+                links=[RSSEntryLinks(href=link.attrib["href"]) for link in element.iter(f"{ATOM_NS}link") if "href" in link.attrib],
+            ))
+            element.clear()  # Entries are not needed once converted
+    parser.close()
+    return RSSFeed(entries=entries, feed={})
+
+def parse_feed_full(xml: bytes) -> RSSFeed:
+    """Parses the whole feed with feedparser. Blocking, run it off the event loop."""
+    return cast(RSSFeed, parse(xml))
+
 class YTBClient:
-    def __init__(self, client: Zenox) -> None:
-        API_KEY = client.config.youtube_api_key
+    def __init__(self, client: Zenox, quota: QuotaLedger | None = None) -> None:
         self.client = client
-        self.youtube = googleapiclient.discovery.build(
-            API_SERVICE_NAME, API_VERSION, developerKey=API_KEY
-        )
-
-    async def get_recent_channel_videos_rss(self, channel_id: str) -> RSSFeed:
-        assert self.client.session is not None, "Client session is not initialized."
-
+        self.api_key = client.config.youtube_api_key
+        self.quota = quota
+
+    @property
+    def _api_headers(self) -> dict[str, str]:
+        """The key goes in a header, a key query parameter would end up in URLs that get logged (e.g. errors, metrics)."""
+        return {"X-Goog-Api-Key": self.api_key}
+
+    async def _spend(self, method: str, units: int) -> None:
+        """YouTube charges every answered call, including failed ones."""
+        if self.quota is not None:
+            await self.quota.spend(method, units)
+
+    async def get_recent_channel_videos_rss(self, channel_id: str, *, stop_at: Collection[str] = (), streaming: bool = True) -> RSSFeed:
+        """Fetches the feed and parses it in a worker thread, so the event loop keeps serving the shards.
+        The streaming parser stops at the first video in stop_at, feedparser always reads everything."""
         rss_feed_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
-        response = await self.client.session.get(rss_feed_url)
-        xml = await response.text()
+        response = await self.client.http_client.get(rss_feed_url)
 
-        feed = parse(xml)
-        return cast(RSSFeed, feed)
+        if streaming:
+            try:
+                return await asyncio.to_thread(parse_feed_streaming, response.body, stop_at)
+            except ET.ParseError:
+                pass  # Not well-formed, let feedparser's lenient parser have a go
+        return await asyncio.to_thread(parse_feed_full, response.body)
 
     async def get_video_details(self, video_id: str) -> List[VideoDetails] | None:
-        request = self.youtube.videos().list(
-            part="snippet,liveStreamingDetails",
-            id=video_id,
+        """Calls videos.list directly on the shared HTTP client, no discovery document or executor involved."""
+        response = await self.client.http_client.get(
+            VIDEOS_LIST_URL,
+            headers=self._api_headers,
+            params={"part": "snippet,liveStreamingDetails", "id": video_id},
         )
-        response = await self.client.loop.run_in_executor(self.client.executor, request.execute)
-        if response.get("items") is None or len(response.get("items", [])) == 0:
+        await self._spend("videos.list", 1)
+        response.raise_for_status()
+        data = cast(VideoListResponse, response.json())
+        items = data.get("items")
+        if not items:
             return None
-        return cast(List[VideoDetails], response.get("items", []))
\ No newline at end of file
+        return items
+
+    async def get_videos_details(self, video_ids: List[str]) -> Dict[str, VideoDetails]:
+        """Resolves many videos with one videos.list call per VIDEOS_LIST_MAX_IDS ids.
+        Ids YouTube does not know (e.g. deleted videos) are missing from the result."""
+        details: Dict[str, VideoDetails] = {}
+        video_ids = list(dict.fromkeys(video_ids))
+        for i in range(0, len(video_ids), VIDEOS_LIST_MAX_IDS):
+            response = await self.client.http_client.get(
+                VIDEOS_LIST_URL,
+                headers=self._api_headers,
+                params={
+                    "part": "snippet,liveStreamingDetails",
+                    "id": ",".join(video_ids[i:i + VIDEOS_LIST_MAX_IDS]),
+                    "maxResults": str(VIDEOS_LIST_MAX_IDS),
+                },
+            )
+            await self._spend("videos.list", 1)
+            response.raise_for_status()
+            data = cast(VideoListResponse, response.json())
+            for item in data.get("items", []):
+                details[item["id"]] = item
+        return details
\ No newline at end of file
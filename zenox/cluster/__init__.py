@@ -0,0 +1,4 @@
+from __future__ import annotations
+
+from .launcher import *  # noqa: F403
+from .stats import *  # noqa: F403
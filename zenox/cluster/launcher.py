@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import signal
+import subprocess
+import sys
+import time
+from types import FrameType
+from typing import TYPE_CHECKING, ClassVar
+
+import aiohttp
+
+from ..enums import PrintColors
+
+if TYPE_CHECKING:
+    from ..config import Config
+
+__all__ = ("ClusterLauncher", "recommended_shard_count", "shard_ranges")
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+# CLI flags the launcher sets per worker, the ones that take a value unless given as --flag=value
+LAUNCHER_VALUE_FLAGS = frozenset({"cluster_id", "shard_ids", "shard_count", "cluster_workers"})
+LAUNCHER_SWITCH_FLAGS = frozenset({"schedule", "no_schedule"})
+
+
+def shard_ranges(shard_count: int, workers: int) -> list[list[int]]:
+    """Splits the shards into contiguous ranges, sizes differing by at most one."""
+    size, extra = divmod(shard_count, workers)
+    ranges: list[list[int]] = []
+    start = 0
+    for worker in range(workers):
+        end = start + size + (1 if worker < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def recommended_shard_count(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return int(data["shards"])
+
+
+class ClusterLauncher:
+    """Runs the bot as one worker process per contiguous shard range, so the gateway load spreads over cores.
+
+    Every worker runs main.py again with the launcher's own CLI flags plus --cluster_id, --shard_ids and
+    --shard_count. Only worker 0 gets --schedule (if the launcher has it). The other workers still reconcile the guilds of their own shards.
+    Workers share state through MongoDB only. Crashed workers are restarted, and SIGINT / SIGTERM are passed
+    on as SIGINT so the workers close cleanly."""
+
+    IDENTIFY_INTERVAL: ClassVar[int] = 5
+    """Seconds Discord wants between two identifies, used to stagger the worker starts"""
+    RESTART_DELAY: ClassVar[int] = 10
+    STOP_TIMEOUT: ClassVar[int] = 30
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.workers = config.cluster_workers
+        self._processes: dict[int, subprocess.Popen[bytes]] = {}
+        self._restart_at: dict[int, float] = {}
+        self._stopping = False
+
+    @staticmethod
+    def _forwarded_args(argv: list[str]) -> list[str]:
+        """The launcher's CLI arguments (e.g. --cache_watcher), without the flags it sets per worker."""
+        forwarded: list[str] = []
+        skip_value = False
+        for arg in argv:
+            if skip_value:
+                skip_value = False
+                continue
+            if arg.startswith("--"):
+                name, has_value, _ = arg[2:].partition("=")
+                name = name.replace("-", "_")
+                if name in LAUNCHER_SWITCH_FLAGS:
+                    continue
+                if name in LAUNCHER_VALUE_FLAGS:
+                    skip_value = not has_value
+                    continue
+            forwarded.append(arg)
+        return forwarded
+
+    def _command(self, cluster_id: int, shard_ids: list[int], shard_count: int) -> list[str]:
+        return [
+            sys.executable,
+            sys.argv[0],
+            *self._forwarded_args(sys.argv[1:]),
+            "--cluster_id", str(cluster_id),
+            "--shard_ids", json.dumps(shard_ids),
+            "--shard_count", str(shard_count),
+            "--cluster_workers", str(self.workers),
+            "--schedule" if cluster_id == 0 and self.config.schedule else "--no-schedule",
+        ]
+
+    def _spawn(self, cluster_id: int, shard_ids: list[int], shard_count: int) -> None:
+        print(f"[ClusterLauncher] Info - {PrintColors.OKCYAN}Starting worker {cluster_id} with shards {shard_ids[0]}-{shard_ids[-1]}{PrintColors.ENDC}")
+        self._processes[cluster_id] = subprocess.Popen(self._command(cluster_id, shard_ids, shard_count))
+
+    def _stop(self, signum: int, frame: FrameType | None) -> None:
+        self._stopping = True
+
+    def _sleep(self, seconds: float) -> None:
+        """Sleeps in steps, so a stop signal is noticed quickly."""
+        deadline = time.monotonic() + seconds
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(min(1.0, deadline - time.monotonic()))
+
+    def run(self) -> int:
+        shard_count = self.config.shard_count or asyncio.run(recommended_shard_count(self.config.discord_token))
+        shard_count = max(shard_count, self.workers)
+        ranges = shard_ranges(shard_count, self.workers)
+        print(f"[ClusterLauncher] Info - {PrintColors.HEADER}Launching {self.workers} workers for {shard_count} shards{PrintColors.ENDC}")
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        try:
+            for cluster_id, shard_ids in enumerate(ranges):
+                if self._stopping:
+                    break
+                self._spawn(cluster_id, shard_ids, shard_count)
+                # Each worker identifies its shards one after another, the next one starts when it is done
+                self._sleep(len(shard_ids) * self.IDENTIFY_INTERVAL)
+
+            while not self._stopping:
+                now = time.monotonic()
+                for cluster_id, process in self._processes.items():
+                    code = process.poll()
+                    if code is None:
+                        continue
+                    if cluster_id not in self._restart_at:
+                        print(f"[ClusterLauncher] Error - {PrintColors.FAIL}Worker {cluster_id} exited with code {code}, restarting in {self.RESTART_DELAY}s{PrintColors.ENDC}")
+                        self._restart_at[cluster_id] = now + self.RESTART_DELAY
+                    elif self._restart_at[cluster_id] <= now:
+                        del self._restart_at[cluster_id]
+                        self._spawn(cluster_id, ranges[cluster_id], shard_count)
+                self._sleep(1)
+        finally:
+            self._shutdown()
+        return 0
+
+    def _shutdown(self) -> None:
+        print(f"[ClusterLauncher] Warning - {PrintColors.WARNING}Stopping {len(self._processes)} workers...{PrintColors.ENDC}")
+        for process in self._processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        for cluster_id, process in self._processes.items():
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                print(f"[ClusterLauncher] Error - {PrintColors.FAIL}Worker {cluster_id} did not stop in time, killing it{PrintColors.ENDC}")
+                process.kill()
+                process.wait()
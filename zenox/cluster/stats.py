@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, ClassVar
+
+from ..db.mongodb import DB
+
+if TYPE_CHECKING:
+    from ..bot import Zenox
+
+__all__ = ("ClusterStats",)
+
+
+class ClusterStats:
+    """Numbers of every cluster worker, kept in DB.cache so any worker can answer for the whole bot.
+    Outside cluster mode they come straight from the client."""
+
+    STALE_AFTER: ClassVar[int] = 600
+    """Seconds after which the numbers of a worker that stopped publishing are left out"""
+
+    @classmethod
+    def _document_id(cls, cluster_id: int) -> str:
+        return f"cluster:{cluster_id}"
+
+    @classmethod
+    async def publish(cls, client: Zenox) -> None:
+        if client.config.cluster_id is None:
+            return
+        await DB.cache.update_one(
+            {"_id": cls._document_id(client.config.cluster_id)},
+            {"$set": {
+                "shard_ids": client.config.shard_ids,
+                "guilds": len(client.guilds),
+                "members": sum(guild.member_count or 0 for guild in client.guilds),
+                "updated_at": int(time.time()),
+            }},
+            upsert=True,
+        )
+
+    @classmethod
+    async def guild_count(cls, client: Zenox) -> int:
+        if client.config.cluster_id is None:
+            return len(client.guilds)
+        total = len(client.guilds)
+        async for data in DB.cache.find(
+            {
+                "_id": {"$in": [cls._document_id(i) for i in range(client.config.cluster_workers) if i != client.config.cluster_id]},
+                "updated_at": {"$gte": int(time.time()) - cls.STALE_AFTER},
+            },
+            {"guilds": 1},
+        ):
+            total += data["guilds"]
+        return total
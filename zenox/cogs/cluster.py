@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from discord.ext import commands, tasks
+from typing import TYPE_CHECKING
+
+from ..cluster import ClusterStats
+
+if TYPE_CHECKING:
+    from ..bot import Zenox
+
+
+class Cluster(commands.Cog):
+    """Publishes the numbers of this cluster worker for the others, see ClusterStats."""
+
+    def __init__(self, client: Zenox):
+        self.client = client
+
+    async def cog_load(self):
+        if self.client.config.cluster_id is None:
+            return
+        self.publish_stats.start()
+
+    async def cog_unload(self):
+        if self.client.config.cluster_id is None:
+            return
+        self.publish_stats.stop()
+
+    @tasks.loop(minutes=1)
+    async def publish_stats(self):
+        try:
+            await ClusterStats.publish(self.client)
+        except Exception as e:
+            self.client.capture_exception(e)
+
+    @publish_stats.before_loop
+    async def before_loops(self) -> None:
+        await self.client.wait_until_ready()
+
+
+async def setup(client: Zenox) -> None:
+    await client.add_cog(Cluster(client))
@@ -10,13 +10,14 @@ from typing import TYPE_CHECKING
 
 from zenox import emojis
 from zenox.l10n import LocaleStr
-from zenox.db.mongodb import DB
-from zenox.db.classes import Guild, SpecialProgram
+from zenox.db.mongodb import DB, reminder_enabled
+from zenox.db.classes import DeliveryRecord, SpecialProgram
 from zenox.embeds import DefaultEmbed
 from zenox.enums import Game
 from zenox.constants import ZENOX_LOCALES, HOYO_OFFICIAL_CHANNELS
 from zenox.ui.components import Modal, TextInput, Label
 from zenox.utils import send_webhook
+from zenox.delivery import SCHEDULER, CREATE_SCHEDULED_EVENT, resolve_guild
 
 if TYPE_CHECKING:
     from ..bot import Zenox
@@ -99,25 +100,26 @@ class Dev(commands.GroupCog, group_name="dev"):
     async def _create_events(cls, client: Zenox, data: SpecialProgram) -> tuple[int, int, int]:
         _success, _forbidden, _failed = 0, 0, 0
         _translations = cls._pre_translate_schedule_stream(data)
+        # Loaded once per broadcast, every guild gets the same bytes
+        image = await data.load_early_image()
 
         # Find only guilds that have stream reminders enabled for this game
-        cursor = DB.guilds.find({f"reminders.{data.game.value}.stream_reminder": True}, {"id": 1, "_id": 0})
-        async for guild_data in cursor:
+        records = DeliveryRecord.find("reminders", data.game, reminder_enabled(data.game.value))
+        async for record in records:
             try:
-                guild = await Guild.new(guild_data["id"])
-
-                guild_obj = client.get_guild(guild.id) or await client.fetch_guild(guild.id)
-
-                await guild_obj.create_scheduled_event(
-                    name=_translations[guild.language]["name"],
-                    description=_translations[guild.language]["description"],
-                    start_time=datetime.datetime.fromtimestamp(data.stream_start_time, pytz.UTC),
-                    end_time=datetime.datetime.fromtimestamp(data.stream_end_time, pytz.UTC),
-                    location=HOYO_OFFICIAL_CHANNELS[data.game]["Twitch"],
-                    image=data.stream_early_image,
-                    entity_type=discord.EntityType.external,
-                    privacy_level=discord.PrivacyLevel.guild_only
-                )
+                guild_obj = await resolve_guild(client, record.guild_id)
+
+                async with SCHEDULER.acquire(CREATE_SCHEDULED_EVENT, record.guild_id):
+                    await guild_obj.create_scheduled_event(
+                        name=_translations[record.language]["name"],
+                        description=_translations[record.language]["description"],
+                        start_time=datetime.datetime.fromtimestamp(data.stream_start_time, pytz.UTC),
+                        end_time=datetime.datetime.fromtimestamp(data.stream_end_time, pytz.UTC),
+                        location=HOYO_OFFICIAL_CHANNELS[data.game]["Twitch"],
+                        image=image,
+                        entity_type=discord.EntityType.external,
+                        privacy_level=discord.PrivacyLevel.guild_only
+                    )
                 _success += 1
             except discord.Forbidden:
                 _forbidden += 1
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import discord
+from discord.ext import commands
+from typing import TYPE_CHECKING
+
+from ..auto_tasks.check_database import CheckDatabase
+
+if TYPE_CHECKING:
+    from ..bot import Zenox
+
+
+class Guilds(commands.Cog):
+    """Keeps the pending deletion state of guild documents up to date as the bot joins and leaves guilds."""
+
+    def __init__(self, client: Zenox):
+        self.client = client
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        try:
+            await CheckDatabase.guild_joined(guild.id)
+        except Exception as e:
+            self.client.capture_exception(e)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        try:
+            await CheckDatabase.guild_removed(guild.id)
+        except Exception as e:
+            self.client.capture_exception(e)
+
+
+async def setup(client: Zenox) -> None:
+    await client.add_cog(Guilds(client))
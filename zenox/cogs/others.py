@@ -7,6 +7,7 @@ import itertools
 import psutil
 from discord.ext import commands, tasks
 from typing import TYPE_CHECKING
+from ..cluster import ClusterStats
 from ..embeds import DefaultEmbed
 from ..l10n import LocaleStr
 
@@ -19,12 +20,12 @@ class Others(commands.Cog):
         self.process = psutil.Process()
 
     async def cog_load(self):
-        if self.client.env != "prod":
+        if self.client.env != "prod" or not self.client.is_primary:
             return
         self.update_vcs_state.start()
     
     async def cog_unload(self):
-        if self.client.env != "prod":
+        if self.client.env != "prod" or not self.client.is_primary:
             return
         self.update_vcs_state.cancel()
     
@@ -43,7 +44,7 @@ class Others(commands.Cog):
         vc_rotator = itertools.cycle(VC_IDS)
 
         # Server Count
-        server_count = len(self.client.guilds)
+        server_count = await ClusterStats.guild_count(self.client)
         vc = guild.get_channel(next(vc_rotator))
         if vc is not None:
             await vc.edit(name=f"{server_count} Servers")
@@ -68,7 +69,7 @@ class Others(commands.Cog):
 
         # guild count
         embed.add_field(
-            name=LocaleStr(key="about_command.guild_count"), value=str(len(interaction.client.guilds))
+            name=LocaleStr(key="about_command.guild_count"), value=str(await ClusterStats.guild_count(self.client))
         )
 
         # ram usage
@@ -53,7 +53,8 @@ class PrometheusCog(commands.Cog):
 
         UPTIME_GAUGE.set(time.time())
 
-        start_http_server(self.port)
+        # Every cluster worker exports its own metrics
+        start_http_server(self.port + (self.client.config.cluster_id or 0))
     
     @commands.Cog.listener()
     async def on_connect(self):
@@ -92,6 +93,8 @@ class PrometheusCog(commands.Cog):
         GUILD_GAUGE.set(len(self.client.guilds))
 
     async def save_locales(self):
+        if not self.client.is_primary:
+            return  # Read from the database, the same for every cluster worker
         locales = [
             doc["language"]
             async for doc in DB.guilds.find()
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import datetime
+import functools
+import time
 from discord.ext import commands, tasks
 from typing import TYPE_CHECKING
-from zenox.constants import UTC_8
+from zenox.constants import CHECK_CODES_INTERVAL, CODE_URLS, LEADER_LEASE_TTL, UTC_8, YTB_POLL_MINUTES
 
 from ..auto_tasks.check_codes import CheckCodes
 from ..auto_tasks.check_database import CheckDatabase
 from ..auto_tasks.ytb_monitor import YTBMonitor
+from ..delivery import OutboxWorker
+from ..enums import Game
 
 if TYPE_CHECKING:
     from zenox.bot.bot import Zenox
@@ -15,36 +19,86 @@ if TYPE_CHECKING:
 class Schedule(commands.Cog):
     def __init__(self, client: Zenox):
         self.client = client
+        # One loop per game, so a slow check or a long interval of one game never delays the others
+        self.check_codes: dict[Game, tasks.Loop] = {}
+        for game in CODE_URLS:
+            loop = tasks.loop(seconds=CHECK_CODES_INTERVAL, name=f"check_codes:{game.value}")(functools.partial(self._check_codes, game))
+            loop.before_loop(self.before_loops)
+            self.check_codes[game] = loop
     
     async def cog_load(self):
         if not self.client.config.schedule:
+            if self.client.config.cluster_id is not None:
+                # Other cluster workers reconcile the guilds of their own shards
+                self.check_database.start()
             return
-        self.check_codes.start()
+        for loop in self.check_codes.values():
+            loop.start()
         self.check_database.start()
         self.ytb_monitor.start()
+        self.pushed_videos.start()
+        self.outbox_resume.start()
     
     async def cog_unload(self):
         if not self.client.config.schedule:
+            if self.client.config.cluster_id is not None:
+                self.check_database.stop()
             return
-        self.check_codes.stop()
+        for loop in self.check_codes.values():
+            loop.stop()
         self.check_database.stop()
         self.ytb_monitor.stop()
+        self.pushed_videos.stop()
+        self.outbox_resume.stop()
 
-    @tasks.loop(minutes=5)
-    async def check_codes(self):
-        await CheckCodes.execute(self.client)
+    async def _leading(self) -> bool:
+        """Loops tick on every replica, but only the holder of the scheduling lease runs the jobs."""
+        return self.client.leader is None or await self.client.leader.confirm()
+
+    async def _check_codes(self, game: Game) -> None:
+        loop = self.check_codes[game]
+        if not await self._leading():
+            # Standby, check again soon so a takeover does not wait for a long idle interval
+            loop.change_interval(seconds=LEADER_LEASE_TTL)
+            return
+        start = time.time()
+        await CheckCodes.execute(self.client, game)
+        # The loop counts the interval from the start of this iteration; wake up when the game is due again
+        loop.change_interval(seconds=max(1.0, CheckCodes.next_run(game) - start))
     
     @tasks.loop(time=datetime.time(0, 0, 0, tzinfo=UTC_8))
     async def check_database(self):
+        if not await self._leading():
+            return
         await CheckDatabase.execute(self.client)
     
-    @tasks.loop(minutes=3)
+    @tasks.loop(minutes=YTB_POLL_MINUTES)
     async def ytb_monitor(self):
+        if not await self._leading():
+            return
         await YTBMonitor.execute(self.client)
+        self._adapt_ytb_interval()
+
+    def _adapt_ytb_interval(self) -> None:
+        # Slower with WebSub or when the YouTube quota runs low, applies from the next iteration
+        self.ytb_monitor.change_interval(seconds=YTBMonitor.interval)
     
-    @check_codes.before_loop
+    @tasks.loop(minutes=1)
+    async def pushed_videos(self):
+        if not await self._leading():
+            return
+        await YTBMonitor.handle_stored_pushes(self.client)
+
+    @tasks.loop(minutes=1)
+    async def outbox_resume(self):
+        if not await self._leading():
+            return
+        await OutboxWorker.resume(self.client)
+
     @check_database.before_loop
     @ytb_monitor.before_loop
+    @pushed_videos.before_loop
+    @outbox_resume.before_loop
     async def before_loops(self) -> None:
         await self.client.wait_until_ready()
 
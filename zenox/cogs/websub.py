@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from discord.ext import commands
+from typing import TYPE_CHECKING
+
+from ..auto_tasks.ytb_monitor import YTBMonitor
+from ..constants import GAME_YOUTUBE_CHANNEL_ID
+from ..enums import Game, PrintColors
+from ..websub import WebSubReceiver
+
+if TYPE_CHECKING:
+    from ..bot import Zenox
+
+
+class WebSub(commands.Cog):
+    def __init__(self, client: Zenox):
+        self.client = client
+        self.receiver: WebSubReceiver | None = None
+
+    async def cog_load(self):
+        if not self.client.config.schedule or not self.client.config.websub_callback_url:
+            return
+        self.receiver = WebSubReceiver(
+            http=self.client.http_client,
+            channels=GAME_YOUTUBE_CHANNEL_ID,
+            callback_url=self.client.config.websub_callback_url,
+            hub_url=self.client.config.websub_hub_url,
+            secret=self.client.config.websub_secret,
+            on_videos=self.on_videos,
+            port=self.client.config.websub_port,
+        )
+        await self.receiver.start()
+        YTBMonitor.pushes_enabled = True
+
+    async def cog_unload(self):
+        YTBMonitor.pushes_enabled = False
+        if self.receiver is not None:
+            await self.receiver.stop()
+            self.receiver = None
+
+    async def on_videos(self, game: Game, video_ids: list[str]) -> None:
+        await self.client.wait_until_ready()
+        if self.client.leader is not None and not await self.client.leader.confirm():
+            # Only the leader notifies, it picks the stored videos up within a minute
+            print(f"[WebSub] Info - {PrintColors.OKCYAN}Standby replica, storing pushed videos {video_ids} for the leader.{PrintColors.ENDC}")
+            await YTBMonitor.store_push(game, video_ids)
+            return
+        await YTBMonitor.handle_push(self.client, game, video_ids)
+
+
+async def setup(client: Zenox) -> None:
+    await client.add_cog(WebSub(client))
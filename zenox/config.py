@@ -30,9 +30,27 @@ class Config(BaseSettings):
     db_url: str
     webhook_url: str = Field(validation_alias="discord_webhook")
 
+    # Keep in-memory configuration in sync with writes from other processes
+    cache_watcher: bool = False
+
+    # YouTube WebSub push notifications, enabled when a public callback URL is set
+    websub_callback_url: str = ""
+    websub_hub_url: str = "https://pubsubhubbub.appspot.com/subscribe"
+    websub_secret: str = ""
+    websub_port: int = 8090
+
     # Command-line arguments
     schedule: bool = False
 
+    # Cluster mode: with cluster_workers > 0, main.py launches that many worker processes with a shard range each.
+    # shard_count 0 uses the count recommended by Discord. Worker N exports its metrics on port 9180 + N, add
+    # 9180 up to 9180 + cluster_workers - 1 to the Prometheus scrape targets (see prometheus/*.yml)
+    cluster_workers: int = 0
+    shard_count: int = 0
+    # Set by the launcher for its workers
+    cluster_id: int | None = None
+    shard_ids: list[int] = []
+
     model_config = SettingsConfigDict(
         env_file=None if _USE_SECRETS else ".env",
         env_file_encoding="utf-8",
@@ -45,6 +63,9 @@ class Config(BaseSettings):
     def cli_args(self) -> dict[str, Any]:
         return {
             "schedule": self.schedule,
+            "cluster_workers": self.cluster_workers,
+            "cluster_id": self.cluster_id,
+            "shard_ids": self.shard_ids,
         }
 
     @property
@@ -3,6 +3,7 @@ from __future__ import annotations
 import discord
 import datetime
 import pathlib
+import zoneinfo
 import os
 
 from typing import Final
@@ -15,6 +16,62 @@ L10N_PATH = pathlib.Path("./zenox/l10n")
 
 POOL_MAX_WORKERS = min(16, (os.cpu_count() or 1))
 
+CHECK_CODES_GAME_TIMEOUT = 240
+"""Seconds the code check of one game may take before it is cancelled"""
+CHECK_CODES_INTERVAL = 300
+"""Seconds between code checks of a game whose special program starts within STREAM_LEAD_TIME"""
+CHECK_CODES_STREAM_INTERVAL = 30
+"""Seconds between code checks of a game during its stream window, while codes are still missing"""
+CHECK_CODES_IDLE_INTERVAL = 20 * 60
+"""Seconds between code checks of a game without an upcoming special program"""
+CHECK_CODES_JITTER = 0.2
+"""Fraction by which every code check interval is randomly shortened or lengthened"""
+STREAM_LEAD_TIME = 3600
+"""Seconds before a special program from which its stream codes are fetched instead of the regular codes"""
+STREAM_WINDOW_BEFORE = 10 * 60
+STREAM_WINDOW_AFTER = 2 * 3600
+"""Stream window around the start of a special program, when codes are most likely to be released"""
+
+YTB_POLL_FALLBACK_MINUTES = 30
+"""Minutes between RSS polls of YTBMonitor when WebSub pushes new videos"""
+YTB_POLL_MINUTES = 3
+YTB_POLL_MAX_MINUTES = 60
+"""Longest interval YTBMonitor stretches its polls to when the YouTube quota runs low"""
+YTB_NOT_FOUND_RETRIES = 5
+"""Runs a video id unknown to videos.list is looked up again before it is ignored, fresh uploads take a while to show up"""
+
+YOUTUBE_DAILY_QUOTA = 10_000
+"""Units of the YouTube Data API project per day, videos.list costs 1 unit per call"""
+YOUTUBE_QUOTA_RESERVE = 1000
+"""Units the polling leaves for pushed videos and manual lookups"""
+YOUTUBE_QUOTA_TZ = zoneinfo.ZoneInfo("America/Los_Angeles")
+"""The quota resets at midnight Pacific Time, following daylight saving time"""
+
+FANOUT_CONCURRENCY = 16
+"""Maximum number of guilds a broadcast delivers to at the same time"""
+
+GUILD_CACHE_MAX_SIZE = 5000
+GUILD_CACHE_TTL = 3600
+"""Seconds a loaded guild configuration stays cached"""
+PUBLISHED_CODES_MAX_SIZE = 2000
+"""Number of published codes per game kept in memory to skip their database lookup"""
+SPECIAL_PROGRAM_CACHE_TTL = 60
+"""Seconds a loaded special program is reused, long enough to cover one code check"""
+
+RECONCILE_BATCH_SIZE = 1000
+"""Number of guild ids per bulk write of the nightly database check"""
+FULL_RECONCILE_INTERVAL = 7 * 24 * 3600
+"""Seconds between full sweeps of the nightly database check, the runs in between only handle the delta"""
+
+LEADER_LEASE_TTL = 30
+"""Seconds a replica holds the scheduling lease without renewing it, the longest a failover takes"""
+
+INDEX_UNUSED_AFTER = 7 * 24 * 3600
+"""Seconds an index must have been tracked without any access before the report calls it unused"""
+
+OUTBOX_RETENTION = 30 * 24 * 3600
+"""Seconds finished broadcasts and their outbox rows are kept before MongoDB expires them"""
+
 ZENOX_LOCALES: dict[discord.Locale, dict[str, str]] = {
     discord.Locale.american_english: {"name": "English", "emoji": "🇺🇸"},
     discord.Locale.german: {"name": "Deutsch", "emoji": "🇩🇪"},
@@ -5,3 +5,5 @@ from .codes import *  # noqa: F403
 from .videos import *  # noqa: F403
 from .config import *  # noqa: F403
 from .special_programs import *  # noqa: F403
+from .outbox import *  # noqa: F403
+from .delivery import *  # noqa: F403
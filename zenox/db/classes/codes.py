@@ -1,34 +1,152 @@
 from __future__ import annotations
 
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
+from typing import Any, ClassVar
+
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from ..mongodb import DB
+from ...constants import PUBLISHED_CODES_MAX_SIZE
 from ...enums import Game
+from ...metrics import PUBLISHED_CODES_BYTES_GAUGE, PUBLISHED_CODES_GAUGE
 
 __all__ = ("RedemptionCode",)
 
+
+class PublishedCodes:
+    """Per-game set of codes known to be published, capped at maxsize by dropping the oldest.
+    Published is never reset, so a hit is always right and a miss just falls back to the database."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._codes: dict[Game, OrderedDict[str, None]] = {}
+
+    def __contains__(self, item: tuple[Game, str]) -> bool:
+        game, code = item
+        return code in self._codes.get(game, ())
+
+    def add(self, game: Game, codes: list[str]) -> None:
+        game_codes = self._codes.setdefault(game, OrderedDict())
+        for code in codes:
+            game_codes[code] = None
+            game_codes.move_to_end(code)
+        while len(game_codes) > self.maxsize:
+            game_codes.popitem(last=False)
+        self._update_metrics(game)
+
+    def clear(self) -> None:
+        for game in self._codes:
+            self._codes[game].clear()
+            self._update_metrics(game)
+
+    def _update_metrics(self, game: Game) -> None:
+        game_codes = self._codes[game]
+        PUBLISHED_CODES_GAUGE.labels(game.name).set(len(game_codes))
+        PUBLISHED_CODES_BYTES_GAUGE.labels(game.name).set(sys.getsizeof(game_codes) + sum(sys.getsizeof(code) for code in game_codes))
+
 @dataclass
 class RedemptionCode:
     code: str
     game: Game
     published: bool
 
+    published_codes: ClassVar[PublishedCodes] = PublishedCodes(PUBLISHED_CODES_MAX_SIZE)
+
+    @classmethod
+    async def warm(cls) -> None:
+        """Fills published_codes with the most recently added published codes of every game."""
+        cls.published_codes.clear()
+        for game in Game:
+            cursor = DB.codes.find({"game": game.value, "published": True}, {"_id": 0, "code": 1}).sort("_id", DESCENDING).limit(PUBLISHED_CODES_MAX_SIZE)
+            # Oldest first, so the newest codes are the last to be dropped
+            cls.published_codes.add(game, [data["code"] async for data in cursor][::-1])
+
     @classmethod
     async def new(cls, code: str, game: Game) -> RedemptionCode:
-        data = await DB.codes.find_one({"code": code, "game": game.value})
-        if data is None:
-            await cls.add_empty(code, game, False)
-            data = await DB.codes.find_one({"code": code, "game": game.value})
+        if (game, code) in cls.published_codes:
+            return RedemptionCode(code=code, game=game, published=True)
+
+        # One atomic round trip, the unique (code, game) index makes concurrent upserts resolve to the same document
+        data = await DB.codes.find_one_and_update(
+            {"code": code, "game": game.value},
+            {"$setOnInsert": {"published": False}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
 
         assert data is not None
 
-        instance = RedemptionCode(
+        redemption_code = cls._from_document(data)
+        if redemption_code.published:
+            cls.published_codes.add(game, [code])
+        return redemption_code
+
+    @classmethod
+    async def new_many(cls, codes: list[str], game: Game) -> list[RedemptionCode]:
+        """Resolves all codes of a fetch with one $in query, then creates the unknown ones with one bulk write."""
+        codes = list(dict.fromkeys(codes))
+        existing = {
+            code: RedemptionCode(code=code, game=game, published=True) for code in codes if (game, code) in cls.published_codes
+        }
+        unknown = [code for code in codes if code not in existing]
+        if not unknown:
+            return [existing[code] for code in codes]
+
+        async for data in DB.codes.find({"game": game.value, "code": {"$in": unknown}}):
+            existing[data["code"]] = cls._from_document(data)
+        missing = [code for code in unknown if code not in existing]
+        if missing:
+            # Another replica may create the same codes between the find and the bulk write. Only the codes
+            # upserted here are known to be new, the others are read back for their current published state.
+            try:
+                result = await DB.codes.bulk_write(
+                    [
+                        UpdateOne({"code": code, "game": game.value}, {"$setOnInsert": {"published": False}}, upsert=True)
+                        for code in missing
+                    ],
+                    ordered=False,
+                )
+                upserted = result.upserted_ids or {}
+            except BulkWriteError as e:
+                # Concurrent upserts of the same code can collide on the unique index, the code exists either way
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+                upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+
+            inserted = {missing[index] for index in upserted}
+            for code in inserted:
+                existing[code] = RedemptionCode(code=code, game=game, published=False)
+            matched = [code for code in missing if code not in inserted]
+            if matched:
+                async for data in DB.codes.find({"game": game.value, "code": {"$in": matched}}):
+                    existing[data["code"]] = cls._from_document(data)
+
+        # Codes published by another replica or before the cache was warmed, so the next fetch skips the lookup
+        found_published = [code for code in unknown if existing[code].published]
+        if found_published:
+            cls.published_codes.add(game, found_published)
+        return [existing[code] for code in codes]
+
+    @classmethod
+    async def mark_published(cls, codes: list[RedemptionCode]) -> None:
+        by_game: dict[Game, list[str]] = {}
+        for code in codes:
+            by_game.setdefault(code.game, []).append(code.code)
+            code.published = True
+        for game, game_codes in by_game.items():
+            await DB.codes.update_many({"game": game.value, "code": {"$in": game_codes}}, {"$set": {"published": True}})
+            cls.published_codes.add(game, game_codes)
+
+    @classmethod
+    def _from_document(cls, data: dict[str, Any]) -> RedemptionCode:
+        return RedemptionCode(
             code=data["code"],
             game=Game(data["game"]),
             published=data["published"],
         )
-
-        return instance
     
     @classmethod
     async def add_empty(cls, code: str, game: Game, published: bool) -> None:
@@ -36,4 +154,4 @@ class RedemptionCode:
             "code": code,
             "game": game.value,
             "published": published
-        })
\ No newline at end of file
+        })
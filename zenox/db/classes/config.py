@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Any
 
-from ..mongodb import DB
+from ..mongodb import DB, versioned
 from ...enums import Game
 
 __all__ = ("ModuleConfig", "StreamCodesConfig")
@@ -12,6 +12,7 @@ __all__ = ("ModuleConfig", "StreamCodesConfig")
 class ModuleConfig:
     """Global configuration for the bot. This is not guild-specific."""
     stream_codes_config: dict[Game, StreamCodesConfig]
+    version: int = field(default=0, repr=False, compare=False)
 
     @classmethod
     async def new(cls):
@@ -22,13 +23,22 @@ class ModuleConfig:
 
         assert data is not None
 
-        instance = ModuleConfig(
+        return cls._from_document(data)
+
+    @classmethod
+    def _from_document(cls, data: dict[str, Any]) -> ModuleConfig:
+        return ModuleConfig(
             stream_codes_config={
                 Game(game): StreamCodesConfig(**data["stream_codes_config"][game]) for game in data["stream_codes_config"]
-            }
+            },
+            version=data.get("_v", 0),
         )
 
-        return instance
+    def _apply_document(self, data: dict[str, Any]) -> None:
+        """Replace the loaded state in place, so references to this object see the change"""
+        updated = self._from_document(data)
+        for f in fields(self):
+            setattr(self, f.name, getattr(updated, f.name))
     
     @classmethod
     async def add_empty(cls) -> None:
@@ -46,7 +56,8 @@ class ModuleConfig:
         })
     
     async def _update_val(self, key: str, value: Any, operator: str = "$set") -> None:
-        await DB.config.update_one({"_id": "global_config"}, {operator: {key: value}})
+        await DB.config.update_one({"_id": "global_config"}, versioned({operator: {key: value}}))
+        self.version += 1
 
         # Update the cache for direct class attributes (non-nested fields)
         if "." not in key:
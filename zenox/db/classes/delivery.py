@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import discord
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+from ..mongodb import DB
+from ...enums import Game
+
+__all__ = ("DeliveryRecord",)
+
+
+@dataclass(slots=True)
+class DeliveryRecord:
+    """The part of a guild configuration a broadcast needs to deliver to one guild.
+    Built straight from a projected DB.guilds cursor instead of loading a full Guild per recipient."""
+    guild_id: int
+    language: discord.Locale
+    channel: int | None = None
+    mention_role: int | None = None
+    mention_everyone: bool = False
+
+    @staticmethod
+    def projection(module_name: str, game: Game) -> dict[str, int]:
+        prefix = f"{module_name}.{game.value}"
+        return {
+            "_id": 0,
+            "id": 1,
+            "language": 1,
+            f"{prefix}.channel": 1,
+            f"{prefix}.mention_role": 1,
+            f"{prefix}.mention_everyone": 1,
+        }
+
+    @classmethod
+    def from_guild_document(cls, data: dict[str, Any], module_name: str, game: Game) -> DeliveryRecord:
+        settings = data.get(module_name, {}).get(game.value, {})
+        return DeliveryRecord(
+            guild_id=data["id"],
+            language=discord.Locale(data["language"]),
+            channel=settings.get("channel"),
+            mention_role=settings.get("mention_role"),
+            mention_everyone=settings.get("mention_everyone", False),
+        )
+
+    @classmethod
+    def from_document(cls, data: dict[str, Any]) -> DeliveryRecord:
+        return DeliveryRecord(
+            guild_id=data["guild_id"],
+            language=discord.Locale(data["language"]),
+            channel=data["channel"],
+            mention_role=data["mention_role"],
+            mention_everyone=data["mention_everyone"],
+        )
+
+    def to_document(self) -> dict[str, Any]:
+        return {
+            "guild_id": self.guild_id,
+            "language": self.language.value,
+            "channel": self.channel,
+            "mention_role": self.mention_role,
+            "mention_everyone": self.mention_everyone,
+        }
+
+    @classmethod
+    async def find(cls, module_name: str, game: Game, query: dict[str, Any]) -> AsyncIterator[DeliveryRecord]:
+        """Yields a record per guild matching query. The projection keeps the documents small, so the
+        server's default batches (up to 16 MB) cover the whole audience in a few round trips."""
+        cursor = DB.guilds.find(query, cls.projection(module_name, game))
+        async for data in cursor:
+            yield cls.from_guild_document(data, module_name, game)
+
+    @classmethod
+    async def find_one(cls, module_name: str, game: Game, query: dict[str, Any]) -> DeliveryRecord | None:
+        data = await DB.guilds.find_one(query, cls.projection(module_name, game))
+        if data is None:
+            return None
+        return cls.from_guild_document(data, module_name, game)
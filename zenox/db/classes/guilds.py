@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import discord
-from dataclasses import dataclass
-from typing import Any, ClassVar, Dict
+from bson import ObjectId
+from dataclasses import dataclass, field, fields
+from typing import Any, ClassVar
 
-from ..mongodb import DB
+from ..mongodb import DB, versioned
+from ...constants import GUILD_CACHE_MAX_SIZE, GUILD_CACHE_TTL
 from ...enums import Game
+from ...utils.cache import Cache, LRUCache
 
-__all__ = ("Guild", "CodesModule", "ReminderModule")
+__all__ = ("Guild", "GuildIndex", "CodesModule", "ReminderModule")
 
 
 @dataclass
@@ -21,13 +24,17 @@ class Guild:
     codes: dict[Game, CodesModule]
     reminders: dict[Game, ReminderModule]
     youtube_notifications: dict[Game, YTNotificationsModule]
+    # Document identity, used to invalidate the cache from change streams and version polling
+    object_id: ObjectId | None = field(default=None, repr=False, compare=False)
+    version: int = field(default=0, repr=False, compare=False)
 
-    cache: ClassVar[Dict[int, Guild]] = {}
+    cache: ClassVar[Cache[int, Guild]] = LRUCache("guilds", maxsize=GUILD_CACHE_MAX_SIZE, ttl=GUILD_CACHE_TTL)
 
     @classmethod
     async def new(cls, guild_id: int):
-        if guild_id in cls.cache:
-            return cls.cache[guild_id]
+        cached = cls.cache.get(guild_id)
+        if cached is not None:
+            return cached
 
         data = await DB.guilds.find_one({"id": guild_id})
         if data is None:
@@ -36,7 +43,13 @@ class Guild:
 
         assert data is not None
 
-        instance = Guild(
+        instance = cls._from_document(data)
+        cls.cache.set(guild_id, instance)
+        return instance
+
+    @classmethod
+    def _from_document(cls, data: dict[str, Any]) -> Guild:
+        return Guild(
             id=data["id"],
             features=data["features"],
             flags=data["flags"],
@@ -53,15 +66,20 @@ class Guild:
                 Game(game): YTNotificationsModule(**data["youtube_notifications"][game])
                 for game in data["youtube_notifications"]
             },
+            object_id=data.get("_id"),
+            version=data.get("_v", 0),
         )
 
-        cls.cache[guild_id] = instance
-        return instance
+    def _apply_document(self, data: dict[str, Any]) -> None:
+        """Replace the cached state in place, so objects already handed out (e.g. to views) see the change"""
+        updated = self._from_document(data)
+        for f in fields(self):
+            setattr(self, f.name, getattr(updated, f.name))
 
     async def delete(self):
-        if self.id in self.cache:
-            del self.cache[self.id]
+        self.cache.pop(self.id)
         await DB.guilds.delete_one({"id": self.id})
+        GuildIndex.discard(self.id)
 
     @classmethod
     async def add_empty(cls, guild_id: int):
@@ -96,9 +114,11 @@ class Guild:
                 },
             }
         )
+        GuildIndex.add(guild_id)
 
     async def _update_val(self, key: str, value: Any, operator: str = "$set") -> None:
-        await DB.guilds.update_one({"id": self.id}, {operator: {key: value}})
+        await DB.guilds.update_one({"id": self.id}, versioned({operator: {key: value}}))
+        self.version += 1
 
         # Update the cache for direct class attributes (non-nested fields)
         if "." not in key:
@@ -107,16 +127,19 @@ class Guild:
     async def _update_flags(self, flag: str, add: bool) -> None:
         if flag not in self.flags and add:
             self.flags.append(flag)
-            await DB.guilds.update_one({"id": self.id}, {"$addToSet": {"flags": flag}})
+            await DB.guilds.update_one({"id": self.id}, versioned({"$addToSet": {"flags": flag}}))
+            self.version += 1
         elif flag in self.flags and not add:
             self.flags.remove(flag)
-            await DB.guilds.update_one({"id": self.id}, {"$pull": {"flags": flag}})
+            await DB.guilds.update_one({"id": self.id}, versioned({"$pull": {"flags": flag}}))
+            self.version += 1
 
     async def _update_language(self, locale: discord.Locale) -> None:
         await DB.guilds.update_one(
-            {"id": self.id}, {"$set": {"language": locale.value}}
+            {"id": self.id}, versioned({"$set": {"language": locale.value}})
         )
         self.language = locale
+        self.version += 1
 
     async def _update_module_setting(
         self,
@@ -135,10 +158,54 @@ class Guild:
         module = getattr(self, module_name)
         setattr(module[game], setting, value)
 
+    @classmethod
+    async def _update_module_setting_by_id(
+        cls,
+        guild_id: int,
+        module_name: str,
+        game: Game,
+        setting: str,
+        value: Any,
+        operator: str = "$set",
+    ) -> None:
+        """Update a specific setting for a module when only the guild id is at hand"""
+        guild = cls.cache.peek(guild_id)
+        if guild is not None:
+            await guild._update_module_setting(module_name, game, setting, value, operator)
+            return
+        key = f"{module_name}.{game.value}.{setting}"
+        await DB.guilds.update_one({"id": guild_id}, versioned({operator: {key: value}}))
+
     def has_flag(self, flag: str) -> bool:
         return flag in self.flags
 
 
+class GuildIndex:
+    """In-memory set of the guild ids stored in DB.guilds, so reconciliation can diff without scanning the collection"""
+
+    _ids: ClassVar[set[int] | None] = None
+
+    @classmethod
+    async def load(cls) -> set[int]:
+        if cls._ids is None:
+            cls._ids = {data["id"] async for data in DB.guilds.find({}, {"_id": 0, "id": 1})}
+        return cls._ids
+
+    @classmethod
+    def replace(cls, guild_ids: set[int]) -> None:
+        cls._ids = guild_ids
+
+    @classmethod
+    def add(cls, guild_id: int) -> None:
+        if cls._ids is not None:
+            cls._ids.add(guild_id)
+
+    @classmethod
+    def discard(cls, guild_id: int) -> None:
+        if cls._ids is not None:
+            cls._ids.discard(guild_id)
+
+
 @dataclass
 class CodesModule:
     setup: bool
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable
+
+from pymongo import ReturnDocument, UpdateOne
+
+from .delivery import DeliveryRecord
+from ..mongodb import DB
+from ...enums import BroadcastState, OutboxState
+
+__all__ = ("Broadcast", "OutboxEntry")
+
+ENQUEUE_BATCH_SIZE = 500
+
+
+@dataclass
+class Broadcast:
+    """A mass notification. The payload holds everything needed to rebuild the message after a restart."""
+    id: str
+    kind: str
+    payload: dict[str, Any]
+    state: BroadcastState
+    created_at: int
+    started_at: int | None = None
+    finished_at: int | None = None
+    counts: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    async def new(cls, broadcast_id: str, kind: str, payload: dict[str, Any]) -> Broadcast:
+        """Creates the broadcast, or returns the existing one if it was already created."""
+        data = await DB.broadcasts.find_one_and_update(
+            {"_id": broadcast_id},
+            {
+                "$setOnInsert": {
+                    "kind": kind,
+                    "payload": payload,
+                    "state": BroadcastState.PENDING.value,
+                    "created_at": int(time.time()),
+                    "started_at": None,
+                    "finished_at": None,
+                    "counts": {},
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        assert data is not None
+        return cls._from_document(data)
+
+    @classmethod
+    async def unfinished(cls) -> list[Broadcast]:
+        cursor = DB.broadcasts.find({"state": {"$ne": BroadcastState.DONE.value}})
+        return [cls._from_document(data) async for data in cursor]
+
+    @classmethod
+    def _from_document(cls, data: dict[str, Any]) -> Broadcast:
+        return Broadcast(
+            id=data["_id"],
+            kind=data["kind"],
+            payload=data["payload"],
+            state=BroadcastState(data["state"]),
+            created_at=data["created_at"],
+            started_at=data.get("started_at"),
+            finished_at=data.get("finished_at"),
+            counts=data.get("counts", {}),
+        )
+
+    async def _update_val(self, key: str, value: Any, operator: str = "$set") -> None:
+        await DB.broadcasts.update_one({"_id": self.id}, {operator: {key: value}})
+        setattr(self, key, value)
+
+    async def complete(self, counts: dict[str, int]) -> None:
+        """Marks the broadcast done. done_at is a BSON date for the TTL index that expires old broadcasts."""
+        finished_at = int(time.time())
+        await DB.broadcasts.update_one(
+            {"_id": self.id},
+            {
+                "$set": {"state": BroadcastState.DONE.value, "counts": counts, "finished_at": finished_at},
+                "$currentDate": {"done_at": True},
+            },
+        )
+        self.state = BroadcastState.DONE
+        self.counts = counts
+        self.finished_at = finished_at
+
+    async def enqueue(self, records: AsyncIterable[DeliveryRecord]) -> int:
+        """Adds one pending outbox row per guild, carrying its delivery record. Rows that already exist are left untouched."""
+        total = 0
+        batch: list[UpdateOne] = []
+        async for record in records:
+            batch.append(
+                UpdateOne(
+                    {"broadcast_id": self.id, "guild_id": record.guild_id},
+                    {
+                        "$setOnInsert": {
+                            "kind": self.kind,
+                            "record": record.to_document(),
+                            "state": OutboxState.PENDING.value,
+                            "attempts": 0,
+                            "claimed_at": None,
+                            "finished_at": None,
+                            "error": None,
+                        }
+                    },
+                    upsert=True,
+                )
+            )
+            if len(batch) >= ENQUEUE_BATCH_SIZE:
+                await DB.outbox.bulk_write(batch, ordered=False)
+                total += len(batch)
+                batch = []
+        if batch:
+            await DB.outbox.bulk_write(batch, ordered=False)
+            total += len(batch)
+        return total
+
+    async def release_stale_claims(self, timeout: int) -> int:
+        """Puts rows claimed longer than timeout seconds ago (e.g. by a crashed process) back to pending."""
+        result = await DB.outbox.update_many(
+            {
+                "broadcast_id": self.id,
+                "state": OutboxState.CLAIMED.value,
+                "claimed_at": {"$lt": int(time.time()) - timeout},
+            },
+            {"$set": {"state": OutboxState.PENDING.value}},
+        )
+        return result.modified_count
+
+    def pending_entries(self):
+        return DB.outbox.find(
+            {"broadcast_id": self.id, "state": OutboxState.PENDING.value},
+            {"broadcast_id": 1, "guild_id": 1, "attempts": 1},
+        )
+
+    async def count_states(self) -> dict[str, int]:
+        pipeline = [
+            {"$match": {"broadcast_id": self.id}},
+            {"$group": {"_id": "$state", "count": {"$sum": 1}}},
+        ]
+        cursor = await DB.outbox.aggregate(pipeline)
+        return {doc["_id"]: doc["count"] async for doc in cursor}
+
+
+@dataclass
+class OutboxEntry:
+    """Delivery state of a broadcast for a single guild."""
+    broadcast_id: str
+    record: DeliveryRecord
+    attempts: int = 0
+
+    @property
+    def guild_id(self) -> int:
+        return self.record.guild_id
+
+    @property
+    def nonce(self) -> str:
+        """Stable per (broadcast, guild). Discord rejects a second message with the same enforced nonce for a
+        few minutes, so resending a row whose first attempt was interrupted shortly before does not duplicate
+        the notification."""
+        return hashlib.blake2b(f"{self.broadcast_id}:{self.guild_id}".encode(), digest_size=10).hexdigest()
+
+    @classmethod
+    async def claim(cls, broadcast_id: str, guild_id: int) -> OutboxEntry | None:
+        """Atomically moves a pending row to claimed. Returns None if someone else claimed it first."""
+        data = await DB.outbox.find_one_and_update(
+            {"broadcast_id": broadcast_id, "guild_id": guild_id, "state": OutboxState.PENDING.value},
+            {"$set": {"state": OutboxState.CLAIMED.value, "claimed_at": int(time.time())}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if data is None:
+            return None
+        return OutboxEntry(
+            broadcast_id=broadcast_id,
+            record=DeliveryRecord.from_document(data["record"]),
+            attempts=data["attempts"],
+        )
+
+    async def finish(self, state: OutboxState, error: str | None = None) -> None:
+        await DB.outbox.update_one(
+            {"broadcast_id": self.broadcast_id, "guild_id": self.guild_id},
+            {"$set": {"state": state.value, "finished_at": int(time.time()), "error": error}, "$currentDate": {"done_at": True}},
+        )
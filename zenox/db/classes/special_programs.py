@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import discord
 
+from bson import ObjectId
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, ClassVar
 
 from .codes import RedemptionCode
 
 from ..mongodb import DB
+from ...constants import SPECIAL_PROGRAM_CACHE_TTL
 from ...enums import Game
+from ...utils.cache import Cache, LRUCache
 
 __all__ = ("SpecialProgram",)
 
@@ -19,7 +22,8 @@ class SpecialProgram:
     stream_start_time: int
     stream_end_time: int
     stream_title: str
-    stream_early_image: bytes
+    # GridFS file id of the early stream image, None for documents that still embed the image
+    stream_early_image_id: ObjectId | None
     stream_late_image: bytes | None = None
     stream_reminder_published: bool = False
 
@@ -29,15 +33,22 @@ class SpecialProgram:
     codes_count: int = 0
     codes_expire_at: int | None = None
 
+    # Identity map, so one code check reuses a single loaded object. Writes go through the instance and keep it current
+    cache: ClassVar[Cache[tuple[Game, str], SpecialProgram]] = LRUCache("special_programs", maxsize=len(Game) * 4, ttl=SPECIAL_PROGRAM_CACHE_TTL)
+
     @classmethod
     async def new(cls, game: Game, version: str, *, stream_start_time: int = 0, stream_end_time: int = 0, stream_title: str = "", stream_early_image: discord.Attachment | None = None) -> SpecialProgram:
-        data = await DB.special_programs.find_one({"game": game.value, "version": version})
+        cached = cls.cache.get((game, version))
+        if cached is not None:
+            return cached
+
+        data = await DB.special_programs.find_one({"game": game.value, "version": version}, {"stream_early_image": 0})
         if data is None:
             if stream_early_image is None:
                 raise ValueError("stream_early_image must be provided when creating a new SpecialProgram")
             image = await stream_early_image.read()
             await cls.add_empty(game, version, stream_start_time=stream_start_time, stream_end_time=stream_end_time, stream_title=stream_title, stream_early_image=image)
-            data = await DB.special_programs.find_one({"game": game.value, "version": version})
+            data = await DB.special_programs.find_one({"game": game.value, "version": version}, {"stream_early_image": 0})
 
         assert data is not None
 
@@ -47,27 +58,42 @@ class SpecialProgram:
             stream_start_time=data["stream_start_time"],
             stream_end_time=data["stream_end_time"],
             stream_title=data["stream_title"],
-            stream_early_image=data["stream_early_image"],
+            stream_early_image_id=data.get("stream_early_image_id"),
             stream_late_image=data.get("stream_late_image"),
             stream_reminder_published=data["stream_reminder_published"],
-            codes=[await RedemptionCode.new(code_data["code"], Game(code_data["game"])) for code_data in data.get("codes", [])],
+            codes=await cls._load_codes(data.get("codes", [])),
             codes_published=data.get("codes_published", False),
             codes_count=data.get("codes_count", 0),
             codes_expire_at=data.get("codes_expire_at")
 
         )
 
+        cls.cache.set((game, version), instance)
         return instance
 
+    @classmethod
+    async def _load_codes(cls, codes_data: list[dict[str, str]]) -> list[RedemptionCode]:
+        """Hydrates the embedded codes with one $in query per game instead of one lookup per code."""
+        by_game: dict[Game, list[str]] = {}
+        for code_data in codes_data:
+            by_game.setdefault(Game(code_data["game"]), []).append(code_data["code"])
+
+        loaded: dict[tuple[Game, str], RedemptionCode] = {}
+        for game, codes in by_game.items():
+            for code in await RedemptionCode.new_many(codes, game):
+                loaded[(game, code.code)] = code
+        return [loaded[(Game(code_data["game"]), code_data["code"])] for code_data in codes_data]
+
     @classmethod
     async def add_empty(cls, game: Game, version: str, *, stream_start_time: int = 0, stream_end_time: int = 0, stream_title: str = "", stream_early_image: bytes) -> None:
+        image_id = await DB.stream_images.upload_from_stream(f"{game.value}:{version}:early", stream_early_image)
         await DB.special_programs.insert_one({
             "game": game.value,
             "version": version,
             "stream_start_time": stream_start_time,
             "stream_end_time": stream_end_time,
             "stream_title": stream_title,
-            "stream_early_image": stream_early_image,
+            "stream_early_image_id": image_id,
             "stream_late_image": None,
             "stream_reminder_published": False,
             "codes": [],
@@ -76,6 +102,23 @@ class SpecialProgram:
             "codes_expire_at": None
         })
     
+    async def load_early_image(self) -> bytes:
+        """Downloads the early stream image. Documents that still embed it are moved to GridFS on the way."""
+        if self.stream_early_image_id is not None:
+            stream = await DB.stream_images.open_download_stream(self.stream_early_image_id)
+            return await stream.read()
+
+        data = await DB.special_programs.find_one({"game": self.game.value, "version": self.version}, {"stream_early_image": 1})
+        assert data is not None
+        image: bytes = data["stream_early_image"]
+        image_id = await DB.stream_images.upload_from_stream(f"{self.game.value}:{self.version}:early", image)
+        await DB.special_programs.update_one(
+            {"game": self.game.value, "version": self.version},
+            {"$set": {"stream_early_image_id": image_id}, "$unset": {"stream_early_image": ""}},
+        )
+        self.stream_early_image_id = image_id
+        return image
+
     async def _update_val(self, key: str, value: Any, operator: str = "$set") -> None:
         await DB.special_programs.update_one({"game": self.game.value, "version": self.version}, {operator: {key: value}})
         setattr(self, key, value)
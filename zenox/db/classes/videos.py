@@ -3,6 +3,9 @@ from __future__ import annotations
 import datetime
 from dataclasses import dataclass
 
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 from ..mongodb import DB
 from ...enums import Game
 
@@ -16,10 +19,15 @@ class Video:
 
     @classmethod
     async def new(cls, video_id: str, game: Game, title: str) -> Video:
-        data = await DB.videos.find_one({"video_id": video_id, "game": game.value})
-        if data is None:
-            await cls.add_empty(video_id, game, title, datetime.date.today())
-            data = await DB.videos.find_one({"video_id": video_id, "game": game.value})
+        # Convert date to datetime for BSON compatibility
+        dt = datetime.datetime.combine(datetime.date.today(), datetime.time.min, tzinfo=datetime.timezone.utc)
+        # One atomic round trip, the unique (video_id, game) index makes concurrent upserts resolve to the same document
+        data = await DB.videos.find_one_and_update(
+            {"video_id": video_id, "game": game.value},
+            {"$setOnInsert": {"title": title, "date": dt}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
 
         assert data is not None
 
@@ -30,8 +38,28 @@ class Video:
         )
 
         return instance
-        
-    
+
+    @classmethod
+    async def claim(cls, video_id: str, game: Game, title: str) -> bool:
+        """Stores the video if it is new. Returns True only for the one call that inserted it, so of two
+        processes handling the same video only one announces it."""
+        dt = datetime.datetime.combine(datetime.date.today(), datetime.time.min, tzinfo=datetime.timezone.utc)
+        try:
+            result = await DB.videos.update_one(
+                {"video_id": video_id, "game": game.value},
+                {"$setOnInsert": {"title": title, "date": dt}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False  # A concurrent upsert inserted it first
+        return result.upserted_id is not None
+
+    @classmethod
+    async def existing_ids(cls, video_ids: list[str], game: Game) -> set[str]:
+        """Returns which of the given videos are already stored, with a single $in query."""
+        cursor = DB.videos.find({"game": game.value, "video_id": {"$in": video_ids}}, {"_id": 0, "video_id": 1})
+        return {data["video_id"] async for data in cursor}
+
     @classmethod
     async def add_empty(cls, video_id: str, game: Game, title: str, date: datetime.date) -> None:
         # Convert date to datetime for BSON compatibility
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .mongodb import DB
+from ..constants import LEADER_LEASE_TTL
+from ..enums import PrintColors
+from ..metrics import LEADER_GAUGE
+
+if TYPE_CHECKING:
+    from ..bot import Zenox
+
+__all__ = ("LeaderLease",)
+
+
+class LeaderLease:
+    """Elects one replica to run the scheduled jobs, through a lease document in DB.config.
+
+    The holder renews the lease every ttl / 3 seconds; once it stops, another replica takes over after at
+    most ttl seconds, or right away if the holder released the lease on shutdown. Expiry is judged by the
+    database clock ($$NOW), so the replicas' clocks do not need to agree.
+
+    Every takeover increments the lease token, which tells the terms apart in the logs. confirm() checks with
+    the database that this replica still holds the lease under its token before a job starts. This is not
+    fencing: a replica that stalls in the middle of a job can overlap with the next leader until the job
+    ends. Each job's side effects are therefore claimed in the database before they happen: outbox rows
+    are claimed atomically before a guild is notified, and a video is notified only by the process whose
+    upsert inserted it (Video.claim)."""
+
+    RETRY_DELAY: ClassVar[int] = 5
+
+    def __init__(self, client: Zenox, name: str, *, ttl: int = LEADER_LEASE_TTL) -> None:
+        self.client = client
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.token: int | None = None
+        self._valid_until = 0.0
+        self._task: asyncio.Task[None] | None = None
+        LEADER_GAUGE.labels(name).set(0)
+
+    @property
+    def document_id(self) -> str:
+        return f"leader:{self.name}"
+
+    @property
+    def is_leader(self) -> bool:
+        """Local view, without a round trip. Turns False on its own once the lease could have expired."""
+        return self.token is not None and time.monotonic() < self._valid_until
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops renewing and releases the lease, so a standby can take over without waiting for the expiry."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.token is None:
+            return
+        try:
+            await DB.config.update_one(
+                {"_id": self.document_id, "holder": self.holder, "token": self.token},
+                {"$currentDate": {"expires_at": True}},
+            )
+        except PyMongoError as e:
+            self.client.capture_exception(e)
+        self._set_token(None)
+
+    def _set_token(self, token: int | None) -> None:
+        if token != self.token:
+            if token is not None:
+                print(f"[LeaderLease] Info - {PrintColors.OKGREEN}{self.holder} is now leader of {self.name!r} (token {token}).{PrintColors.ENDC}")
+            elif self.token is not None:
+                print(f"[LeaderLease] Warning - {PrintColors.WARNING}{self.holder} lost leadership of {self.name!r}.{PrintColors.ENDC}")
+        self.token = token
+        LEADER_GAUGE.labels(self.name).set(int(token is not None))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._acquire()
+                await asyncio.sleep(self.ttl / 3)
+            except PyMongoError as e:
+                # The lease runs out locally through _valid_until if the database stays unreachable
+                print(f"[LeaderLease] Error - {PrintColors.FAIL}Renewing lease {self.name!r} failed:{PrintColors.ENDC} {e}")
+                self.client.capture_exception(e)
+                await asyncio.sleep(self.RETRY_DELAY)
+
+    async def _acquire(self) -> None:
+        """Renews the lease if held, takes it over if expired. A new holder gets the next token."""
+        sent = time.monotonic()
+        try:
+            data: dict[str, Any] | None = await DB.config.find_one_and_update(
+                {
+                    "_id": self.document_id,
+                    "$or": [{"holder": self.holder}, {"$expr": {"$lte": ["$expires_at", "$$NOW"]}}],
+                },
+                [{"$set": {
+                    "token": {"$cond": [
+                        {"$eq": ["$holder", self.holder]}, "$token", {"$add": [{"$ifNull": ["$token", 0]}, 1]}
+                    ]},
+                    "holder": self.holder,
+                    "expires_at": {"$add": ["$$NOW", self.ttl * 1000]},
+                }}],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            data = None  # Held by another replica, the upsert collided with its document
+        if data is None:
+            self._set_token(None)
+            return
+        # The database set the expiry after the request was sent, so this never outlives the real lease
+        self._valid_until = sent + self.ttl
+        self._set_token(data["token"])
+
+    async def confirm(self) -> bool:
+        """Whether this replica still holds the lease under its token, checked with the database."""
+        if not self.is_leader:
+            return False
+        try:
+            count = await DB.config.count_documents(
+                {
+                    "_id": self.document_id,
+                    "holder": self.holder,
+                    "token": self.token,
+                    "$expr": {"$gt": ["$expires_at", "$$NOW"]},
+                },
+                limit=1,
+            )
+        except PyMongoError as e:
+            self.client.capture_exception(e)
+            return False
+        return count > 0
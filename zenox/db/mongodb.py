@@ -1,8 +1,15 @@
-from pymongo import AsyncMongoClient
+import datetime
+from dataclasses import dataclass, field
+from gridfs import AsyncGridFSBucket
+from pymongo import ASCENDING, AsyncMongoClient, IndexModel
+from pymongo.asynchronous.change_stream import AsyncDatabaseChangeStream
 from pymongo.asynchronous.collection import AsyncCollection
-from typing import Any, Callable, Generic, TypeVar
+from pymongo.errors import OperationFailure
+from typing import Any, Callable, ClassVar, Generic, TypeVar
 
 from zenox.config import CONFIG
+from zenox.constants import INDEX_UNUSED_AFTER, OUTBOX_RETENTION
+from zenox.enums import Game, PrintColors
 
 CLUSTER = AsyncMongoClient(CONFIG.db_url)
 
@@ -19,7 +26,74 @@ class DBProperty(Generic[T]):
         return self.getter(obj)
 
 
+def versioned(update: dict[str, Any]) -> dict[str, Any]:
+    """Adds a bump of the document's `_v` counter to an update, so other processes polling for changes notice it.
+    Manual edits should bump `_v` as well."""
+    update.setdefault("$inc", {})["_v"] = 1
+    return update
+
+
+def channel_configured(module_name: str, game: str) -> dict[str, Any]:
+    """Filter matching guilds that set a channel for a module and game. Also the partial filter of the index
+    backing it, so the query has to use this exact predicate for the planner to pick the index."""
+    return {f"{module_name}.{game}.channel": {"$gt": 0}}
+
+
+def reminder_enabled(game: str) -> dict[str, Any]:
+    """Filter matching guilds with stream reminders enabled for a game. Also the partial filter of its index."""
+    return {f"reminders.{game}.stream_reminder": True}
+
+
+@dataclass(frozen=True)
+class Index:
+    """An index the bot relies on. Names are fixed so the report can match them against the existing indexes."""
+    collection: str
+    name: str
+    keys: list[tuple[str, int]]
+    unique: bool = False
+    partial: dict[str, Any] | None = field(default=None, hash=False)
+    expire_after: int | None = None
+    """Makes this a TTL index, documents are removed this many seconds after the indexed date"""
+
+    def model(self) -> IndexModel:
+        options: dict[str, Any] = {"name": self.name, "unique": self.unique}
+        if self.partial is not None:
+            options["partialFilterExpression"] = self.partial
+        if self.expire_after is not None:
+            options["expireAfterSeconds"] = self.expire_after
+        return IndexModel(self.keys, **options)
+
+
+def _audience_indexes() -> list[Index]:
+    indexes: list[Index] = []
+    for game in Game:
+        slug = game.name.lower()
+        for module_name in ("codes", "youtube_notifications"):
+            field_name = f"{module_name}.{game.value}.channel"
+            indexes.append(
+                Index("guilds", f"{module_name}_{slug}_channel", [(field_name, ASCENDING)], partial=channel_configured(module_name, game.value))
+            )
+        field_name = f"reminders.{game.value}.stream_reminder"
+        indexes.append(Index("guilds", f"reminders_{slug}_stream", [(field_name, ASCENDING)], partial=reminder_enabled(game.value)))
+    return indexes
+
+
 class Database:
+    INDEXES: ClassVar[list[Index]] = [
+        Index("guilds", "id", [("id", ASCENDING)], unique=True),
+        Index("guilds", "flags", [("flags", ASCENDING)]),
+        *_audience_indexes(),
+        Index("codes", "code_game", [("code", ASCENDING), ("game", ASCENDING)], unique=True),
+        Index("videos", "video_id_game", [("video_id", ASCENDING), ("game", ASCENDING)], unique=True),
+        Index("special_programs", "game_version", [("game", ASCENDING), ("version", ASCENDING)], unique=True),
+        Index("broadcasts", "state", [("state", ASCENDING)]),
+        Index("outbox", "broadcast_guild", [("broadcast_id", ASCENDING), ("guild_id", ASCENDING)], unique=True),
+        Index("outbox", "broadcast_state", [("broadcast_id", ASCENDING), ("state", ASCENDING)]),
+        Index("broadcasts", "done_at", [("done_at", ASCENDING)], expire_after=OUTBOX_RETENTION),
+        Index("outbox", "done_at", [("done_at", ASCENDING)], expire_after=OUTBOX_RETENTION),
+    ]
+    """Every index the queries of the bot need, created by ensure_indexes at startup."""
+
     def __init__(self):
         self._db = CLUSTER.get_default_database()
 
@@ -53,5 +127,69 @@ class Database:
         """Collection for caching data."""
         return self._db["cache"]
 
+    @DBProperty
+    def stream_images(self) -> AsyncGridFSBucket:
+        """GridFS bucket for special program stream images, kept out of the documents that are read every check."""
+        return AsyncGridFSBucket(self._db, bucket_name="stream_images")
+
+    @DBProperty
+    def broadcasts(self) -> AsyncCollection:
+        """Collection for mass notifications and their payloads."""
+        return self._db["broadcasts"]
+
+    @DBProperty
+    def outbox(self) -> AsyncCollection:
+        """Collection for per-guild delivery state of broadcasts."""
+        return self._db["outbox"]
+
+    async def watch(self, collections: list[str], **kwargs: Any) -> AsyncDatabaseChangeStream:
+        """Opens a change stream over the given collections. Only available on replica sets and sharded clusters."""
+        return await self._db.watch([{"$match": {"ns.coll": {"$in": collections}}}], **kwargs)
+
+    async def ensure_indexes(self) -> None:
+        """Creates the indexes of INDEXES that do not exist yet, then reports missing and unused ones.
+        A collection that fails (e.g. duplicates blocking a unique index) is reported and does not stop the others."""
+        collections: dict[str, list[Index]] = {}
+        for index in self.INDEXES:
+            collections.setdefault(index.collection, []).append(index)
+
+        for name, indexes in collections.items():
+            try:
+                await self._db[name].create_indexes([index.model() for index in indexes])
+            except OperationFailure as e:
+                print(f"[Database] Error - {PrintColors.FAIL}Failed to create indexes on {name}:{PrintColors.ENDC} {e}")
+        await self.report_indexes(collections)
+
+    @staticmethod
+    def _utc(value: datetime.datetime) -> datetime.datetime:
+        """BSON dates come back naive unless the client is tz aware, they are always UTC."""
+        return value if value.tzinfo is not None else value.replace(tzinfo=datetime.timezone.utc)
+
+    async def report_indexes(self, collections: dict[str, list[Index]]) -> None:
+        """Prints registered indexes that are missing and existing ones that were never used since the server started.
+        Indexes tracked for less than INDEX_UNUSED_AFTER (e.g. just created, or the server just restarted) are not reported as unused."""
+        tracked_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=INDEX_UNUSED_AFTER)
+        for name, indexes in collections.items():
+            try:
+                cursor = await self._db[name].aggregate([{"$indexStats": {}}])
+                stats: dict[str, dict[str, Any]] = {doc["name"]: doc["accesses"] async for doc in cursor}
+            except OperationFailure as e:  # $indexStats needs the clusterMonitor role on some deployments
+                print(f"[Database] Warning - {PrintColors.WARNING}Could not read index stats of {name}:{PrintColors.ENDC} {e}")
+                continue
+
+            registered = {index.name for index in indexes}
+            missing = [index_name for index_name in registered if index_name not in stats]
+            unused = [
+                index_name for index_name, accesses in stats.items()
+                if accesses["ops"] == 0 and index_name != "_id_" and self._utc(accesses["since"]) <= tracked_before
+            ]
+            unregistered = [index_name for index_name in stats if index_name not in registered and index_name != "_id_"]
+            if missing:
+                print(f"[Database] Warning - {PrintColors.WARNING}Missing indexes on {name}:{PrintColors.ENDC} {', '.join(missing)}")
+            if unused:
+                print(f"[Database] Info - {PrintColors.OKCYAN}Unused indexes on {name}:{PrintColors.ENDC} {', '.join(unused)}")
+            if unregistered:
+                print(f"[Database] Info - {PrintColors.OKCYAN}Indexes on {name} not in the registry:{PrintColors.ENDC} {', '.join(unregistered)}")
+
 
 DB = Database()
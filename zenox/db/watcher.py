@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, ClassVar, Mapping
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .classes import Guild
+from .mongodb import DB
+from ..enums import PrintColors
+
+if TYPE_CHECKING:
+    from ..bot import Zenox
+
+__all__ = ("CacheWatcher",)
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+class CacheWatcher:
+    """Keeps Guild.cache and client.db_config in sync with writes made by other replicas or by hand.
+
+    Subscribes to a change stream on the guilds and config collections and patches cached objects in place.
+    When change streams are not available (e.g. a standalone mongod), it falls back to polling the `_v`
+    counter of every cached document."""
+
+    POLL_INTERVAL: ClassVar[int] = 30
+    RETRY_DELAY: ClassVar[int] = 5
+
+    def __init__(self, client: Zenox) -> None:
+        self.client = client
+        self._task: asyncio.Task[None] | None = None
+        self._resume_token: Mapping[str, Any] | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAMS_UNSUPPORTED:
+                    # e.g. the resume token fell off the oplog, start over from now
+                    print(f"[CacheWatcher] Error - {PrintColors.FAIL}Change stream failed:{PrintColors.ENDC} {e}")
+                    self.client.capture_exception(e)
+                    self._resume_token = None
+                    await asyncio.sleep(self.RETRY_DELAY)
+                    continue
+                print(f"[CacheWatcher] Warning - {PrintColors.WARNING}Change streams are not supported, falling back to polling every {self.POLL_INTERVAL}s.{PrintColors.ENDC}")
+                await self._poll()
+                return
+            except PyMongoError as e:
+                print(f"[CacheWatcher] Error - {PrintColors.FAIL}Change stream interrupted:{PrintColors.ENDC} {e}")
+                self.client.capture_exception(e)
+                await asyncio.sleep(self.RETRY_DELAY)
+
+    async def _watch(self) -> None:
+        async with await DB.watch(
+            ["guilds", "config"], full_document="updateLookup", resume_after=self._resume_token
+        ) as stream:
+            print(f"[CacheWatcher] Info - {PrintColors.OKCYAN}Watching guilds and config for changes.{PrintColors.ENDC}")
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                try:
+                    self._apply_change(change)
+                except Exception as e:
+                    self.client.capture_exception(e)
+
+    def _apply_change(self, change: Mapping[str, Any]) -> None:
+        collection = change["ns"]["coll"]
+        document = change.get("fullDocument")
+        if collection == "guilds":
+            if document is None:  # deleted, or deleted again before the lookup
+                self._evict_guild(change["documentKey"]["_id"])
+                return
+            guild = Guild.cache.peek(document["id"])
+            if guild is not None:
+                guild._apply_document(document)
+        elif collection == "config" and change["documentKey"]["_id"] == "global_config":
+            if document is not None and self.client.db_config is not None:
+                self.client.db_config._apply_document(document)
+
+    def _evict_guild(self, object_id: ObjectId) -> None:
+        for guild_id in Guild.cache:
+            guild = Guild.cache.peek(guild_id)
+            if guild is not None and guild.object_id == object_id:
+                Guild.cache.pop(guild_id)
+                return
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            try:
+                await self._poll_guilds()
+                await self._poll_config()
+            except PyMongoError as e:
+                self.client.capture_exception(e)
+
+    async def _poll_guilds(self) -> None:
+        cached = {guild_id: guild for guild_id in Guild.cache if (guild := Guild.cache.peek(guild_id)) is not None}
+        if not cached:
+            return
+
+        versions = {
+            data["id"]: data.get("_v", 0)
+            async for data in DB.guilds.find({"id": {"$in": list(cached)}}, {"_id": 0, "id": 1, "_v": 1})
+        }
+        stale: list[int] = []
+        for guild_id, guild in cached.items():
+            if guild_id not in versions:
+                Guild.cache.pop(guild_id)
+            elif versions[guild_id] != guild.version:
+                stale.append(guild_id)
+
+        if stale:
+            async for data in DB.guilds.find({"id": {"$in": stale}}):
+                guild = Guild.cache.peek(data["id"])
+                if guild is not None:
+                    guild._apply_document(data)
+            print(f"[CacheWatcher] Info - {PrintColors.OKCYAN}Reloaded {len(stale)} changed guilds.{PrintColors.ENDC}")
+
+    async def _poll_config(self) -> None:
+        config = self.client.db_config
+        if config is None:
+            return
+        data = await DB.config.find_one({"_id": "global_config"}, {"_v": 1})
+        if data is None or data.get("_v", 0) == config.version:
+            return
+        data = await DB.config.find_one({"_id": "global_config"})
+        if data is not None:
+            config._apply_document(data)
+            print(f"[CacheWatcher] Info - {PrintColors.OKCYAN}Reloaded global config.{PrintColors.ENDC}")
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from .fanout import *  # noqa: F403
+from .ratelimit import *  # noqa: F403
+from .outbox import *  # noqa: F403
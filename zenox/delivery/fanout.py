@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Awaitable, Callable, Generic, Iterable, TypeVar
+
+from zenox.constants import FANOUT_CONCURRENCY
+from zenox.enums import PrintColors
+
+__all__ = ("FanOut", "FanOutResult", "FanOutReport")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class FanOutResult(Generic[T, R]):
+    """Outcome of a single work item."""
+    index: int
+    item: T
+    result: R | None = None
+    error: Exception | None = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class FanOutReport(Generic[T, R]):
+    """Outcome of a whole fan-out run. Results are ordered like the input items."""
+    name: str
+    results: list[FanOutResult[T, R]] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def succeeded(self) -> list[FanOutResult[T, R]]:
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> list[FanOutResult[T, R]]:
+        return [result for result in self.results if not result.ok]
+
+
+class FanOut(Generic[T, R]):
+    """Runs an async worker over a stream of items with a bounded number of items in flight.
+
+    Items are pulled lazily (so an async DB cursor is never fully buffered) and started in
+    input order. Worker exceptions are recorded on the item's result instead of aborting the run."""
+
+    def __init__(
+        self,
+        name: str,
+        worker: Callable[[T], Awaitable[R]],
+        *,
+        concurrency: int = FANOUT_CONCURRENCY,
+        on_result: Callable[[FanOutResult[T, R]], None] | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.name = name
+        self.worker = worker
+        self.concurrency = concurrency
+        self.on_result = on_result
+
+    async def run(self, items: Iterable[T] | AsyncIterable[T]) -> FanOutReport[T, R]:
+        report: FanOutReport[T, R] = FanOutReport(name=self.name)
+        queue: asyncio.Queue[tuple[int, T] | None] = asyncio.Queue(maxsize=self.concurrency)
+        start = time.perf_counter()
+
+        async def produce() -> None:
+            try:
+                index = 0
+                if isinstance(items, AsyncIterable):
+                    async for item in items:
+                        await queue.put((index, item))
+                        index += 1
+                else:
+                    for item in items:
+                        await queue.put((index, item))
+                        index += 1
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        async def consume() -> None:
+            while (entry := await queue.get()) is not None:
+                index, item = entry
+                result: FanOutResult[T, R] = FanOutResult(index=index, item=item)
+                item_start = time.perf_counter()
+                try:
+                    result.result = await self.worker(item)
+                except Exception as e:
+                    result.error = e
+                result.duration = time.perf_counter() - item_start
+                report.results.append(result)
+                if self.on_result is not None:
+                    self.on_result(result)
+
+        producer = asyncio.create_task(produce())
+        consumers = [asyncio.create_task(consume()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*consumers)
+            await producer
+        finally:
+            for task in (producer, *consumers):
+                task.cancel()
+
+        report.results.sort(key=lambda result: result.index)
+        report.duration = time.perf_counter() - start
+        print(f"[FanOut] Info - {PrintColors.OKBLUE}{self.name} finished in {report.duration:.3f}s:{PrintColors.ENDC} {len(report.succeeded)} succeeded, {len(report.failed)} failed")
+        return report
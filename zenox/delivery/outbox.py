@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, ClassVar
+
+from zenox.db.classes import Broadcast, DeliveryRecord, OutboxEntry
+from zenox.enums import BroadcastState, Game, OutboxState, PrintColors
+from zenox.metrics import OUTBOX_DELIVERY_COUNTER
+
+from .fanout import FanOut
+from .ratelimit import SCHEDULER
+
+if TYPE_CHECKING:
+    from zenox.bot import Zenox
+
+__all__ = ("BroadcastHandler", "Deliver", "OutboxWorker")
+
+Deliver = Callable[[DeliveryRecord, str], Awaitable[bool]]
+"""Sends a broadcast to one guild, given its delivery record and the delivery nonce. Returns False if the guild was skipped."""
+
+
+@dataclass(frozen=True)
+class BroadcastHandler:
+    module_name: str
+    """The guild module (e.g. codes) whose per-game settings the delivery records are built from."""
+    audience: Callable[[dict[str, Any]], dict[str, Any]]
+    """Builds the DB.guilds filter of the guilds that receive the broadcast from its payload."""
+    prepare: Callable[[Zenox, Broadcast], Awaitable[Deliver]]
+    """Builds everything shared by all guilds (translations, embeds, views) once per drain."""
+    complete: Callable[[Zenox, Broadcast], Awaitable[None]] | None = None
+    """Runs once after every row of the broadcast is finished."""
+
+
+class OutboxWorker:
+    """Drains broadcasts from the outbox. Every (broadcast, guild) row moves pending -> claimed -> sent/skipped/failed,
+    so a broadcast interrupted by a restart is resumed where it stopped.
+
+    Delivery is at-least-once. A row claimed by a worker that died is released after CLAIM_TIMEOUT and sent
+    again; the delivery nonce makes Discord drop the resend only while it still remembers the nonce (a few
+    minutes). Claims are kept short and resumed every minute so most resends fall into that window, but a
+    row sent right before a crash and resumed later than that can notify its guild twice."""
+
+    CLAIM_TIMEOUT: ClassVar[int] = 120
+    _handlers: ClassVar[dict[str, BroadcastHandler]] = {}
+    _active: ClassVar[set[str]] = set()
+    _tasks: ClassVar[set[asyncio.Task[None]]] = set()
+
+    @classmethod
+    def register(cls, kind: str, handler: BroadcastHandler) -> None:
+        cls._handlers[kind] = handler
+
+    @classmethod
+    async def publish(cls, client: Zenox, broadcast_id: str, kind: str, payload: dict[str, Any]) -> Broadcast:
+        """Persists the broadcast and drains it. Publishing the same broadcast id twice is a no-op for guilds already notified."""
+        broadcast = await Broadcast.new(broadcast_id, kind, payload)
+        await cls.drain(client, broadcast)
+        return broadcast
+
+    @classmethod
+    def start(cls, client: Zenox, broadcast: Broadcast) -> None:
+        """Drains the broadcast in its own task, so the caller (and its timeouts) does not wait for the delivery.
+        The broadcast is persisted already, a drain that fails is picked up again by resume()."""
+        task = asyncio.create_task(cls._drain_logged(client, broadcast))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def _drain_logged(cls, client: Zenox, broadcast: Broadcast) -> None:
+        try:
+            await cls.drain(client, broadcast)
+        except Exception as e:
+            print(f"[OutboxWorker] Error - {PrintColors.FAIL}Failed to drain broadcast {broadcast.id}:{PrintColors.ENDC} {e}")
+            client.capture_exception(e)
+
+    @classmethod
+    async def resume(cls, client: Zenox) -> None:
+        """Drains every broadcast left unfinished, e.g. by a restart."""
+        for broadcast in await Broadcast.unfinished():
+            if broadcast.id in cls._active:
+                continue
+            print(f"[OutboxWorker] Info - {PrintColors.OKCYAN}Resuming broadcast {broadcast.id}{PrintColors.ENDC}")
+            try:
+                await cls.drain(client, broadcast)
+            except Exception as e:
+                print(f"[OutboxWorker] Error - {PrintColors.FAIL}Failed to resume broadcast {broadcast.id}:{PrintColors.ENDC} {e}")
+                client.capture_exception(e)
+
+    @classmethod
+    async def drain(cls, client: Zenox, broadcast: Broadcast) -> None:
+        if broadcast.id in cls._active:
+            print(f"[OutboxWorker] Warning - {PrintColors.WARNING}Broadcast {broadcast.id} is already being drained, skipping.{PrintColors.ENDC}")
+            return
+        handler = cls._handlers[broadcast.kind]
+
+        cls._active.add(broadcast.id)
+        try:
+            if broadcast.state is BroadcastState.PENDING:
+                game = Game(broadcast.payload["game"])
+                records = DeliveryRecord.find(handler.module_name, game, handler.audience(broadcast.payload))
+                enqueued = await broadcast.enqueue(records)
+                await broadcast._update_val("started_at", int(time.time()))
+                await broadcast._update_val("state", BroadcastState.RUNNING)
+                print(f"[OutboxWorker] Info - {PrintColors.OKBLUE}Enqueued broadcast {broadcast.id} for {enqueued} guilds{PrintColors.ENDC}")
+
+            released = await broadcast.release_stale_claims(cls.CLAIM_TIMEOUT)
+            if released:
+                print(f"[OutboxWorker] Warning - {PrintColors.WARNING}Released {released} stale claims of broadcast {broadcast.id}{PrintColors.ENDC}")
+
+            deliver = await handler.prepare(client, broadcast)
+
+            async def work(row: dict[str, Any]) -> OutboxState | None:
+                return await cls._deliver(client, broadcast, deliver, row["guild_id"])
+
+            start = time.perf_counter()
+            waited = SCHEDULER.wait_time()
+            # Rows claimed and finished while the cursor is open may shift it, so loop until nothing is pending.
+            while True:
+                report = await FanOut(f"outbox:{broadcast.id}", work).run(broadcast.pending_entries())
+                if not any(result.result is not None for result in report.results):
+                    break
+            duration = time.perf_counter() - start
+            waited = SCHEDULER.wait_time() - waited
+
+            counts = await broadcast.count_states()
+            if counts.get(OutboxState.CLAIMED.value, 0):
+                # Claimed by another worker that has not finished yet, it will be picked up by the next resume.
+                return
+
+            await broadcast.complete(counts)
+            if handler.complete is not None:
+                await handler.complete(client, broadcast)
+
+            delivered = counts.get(OutboxState.SENT.value, 0)
+            print(f"[OutboxWorker] Info - {PrintColors.OKGREEN}Broadcast {broadcast.id} done:{PrintColors.ENDC} {counts} ({delivered / duration if duration else 0:.1f} messages/s, {waited:.2f}s waiting for rate limits)")
+        finally:
+            cls._active.discard(broadcast.id)
+
+    @classmethod
+    async def _deliver(cls, client: Zenox, broadcast: Broadcast, deliver: Deliver, guild_id: int) -> OutboxState | None:
+        entry = await OutboxEntry.claim(broadcast.id, guild_id)
+        if entry is None:
+            return None
+
+        try:
+            state = OutboxState.SENT if await deliver(entry.record, entry.nonce) else OutboxState.SKIPPED
+            await entry.finish(state)
+        except Exception as e:
+            state = OutboxState.FAILED
+            await entry.finish(state, error=f"{type(e).__name__}: {e}")
+            client.capture_exception(e)
+
+        OUTBOX_DELIVERY_COUNTER.labels(broadcast.kind, state.value).inc()
+        return state
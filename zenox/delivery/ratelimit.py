@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator
+
+import discord
+
+from zenox.metrics import DELIVERY_QUEUE_GAUGE, DELIVERY_WAIT_HISTOGRAM
+
+if TYPE_CHECKING:
+    from zenox.bot import Zenox
+
+__all__ = (
+    "RouteLimit",
+    "RouteScheduler",
+    "SCHEDULER",
+    "SEND_MESSAGE",
+    "FETCH_GUILD",
+    "CREATE_SCHEDULED_EVENT",
+    "resolve_guild",
+    "resolve_messageable",
+    "role_mention",
+)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    """A Discord REST route and the budget we allow ourselves per major parameter."""
+    route: str
+    limit: int
+    per: float
+
+
+SEND_MESSAGE = RouteLimit("POST /channels/{channel_id}/messages", limit=5, per=5.0)
+FETCH_GUILD = RouteLimit("GET /guilds/{guild_id}", limit=5, per=1.0)
+CREATE_SCHEDULED_EVENT = RouteLimit("POST /guilds/{guild_id}/scheduled-events", limit=5, per=5.0)
+
+
+@dataclass
+class _Bucket:
+    limit: int
+    per: float
+    tokens: float = field(init=False)
+    updated: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def __post_init__(self) -> None:
+        self.tokens = float(self.limit)
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.per)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.limit
+
+    @property
+    def idle(self) -> bool:
+        return self.tokens >= self.limit and not self.lock.locked()
+
+
+class RouteScheduler:
+    """Paces Discord REST calls ahead of time instead of relying on discord.py's reactive 429 handling.
+
+    Every call waits for a token from its (route, major parameter) bucket and from the global bucket.
+    Waiters on the same bucket are served in arrival order. A broadcast sends to a different channel per
+    guild, so it is paced by the global bucket; the route buckets only throttle repeated calls to one channel
+    or guild. A 429 that still happens is retried by discord.py itself after the advertised delay."""
+
+    _PRUNE_THRESHOLD = 10_000
+
+    def __init__(self, global_limit: int = 50, global_per: float = 1.0) -> None:
+        self._global = _Bucket(global_limit, global_per)
+        self._buckets: dict[tuple[str, int], _Bucket] = {}
+        self._waiting: dict[str, int] = {}
+        self._wait_total: dict[str, float] = {}
+
+    def _get_bucket(self, limit: RouteLimit, major: int) -> _Bucket:
+        key = (limit.route, major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._PRUNE_THRESHOLD:
+                self._prune()
+            bucket = self._buckets[key] = _Bucket(limit.limit, limit.per)
+        return bucket
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.idle:
+                del self._buckets[key]
+
+    def queue_depth(self, route: str | None = None) -> int:
+        """Number of calls currently waiting for a token, for one route or all routes."""
+        if route is not None:
+            return self._waiting.get(route, 0)
+        return sum(self._waiting.values())
+
+    def wait_time(self, route: str | None = None) -> float:
+        """Total seconds calls have spent waiting for a token, for one route or all routes."""
+        if route is not None:
+            return self._wait_total.get(route, 0.0)
+        return sum(self._wait_total.values())
+
+    def _set_waiting(self, route: str, delta: int) -> None:
+        self._waiting[route] = self._waiting.get(route, 0) + delta
+        DELIVERY_QUEUE_GAUGE.labels(route).set(self._waiting[route])
+
+    async def wait(self, limit: RouteLimit, major: int) -> float:
+        """Waits until a call to the route may be made. Returns the time spent waiting."""
+        bucket = self._get_bucket(limit, major)
+        start = time.monotonic()
+        self._set_waiting(limit.route, 1)
+        try:
+            async with bucket.lock:
+                while True:
+                    now = time.monotonic()
+                    delay = max(bucket.delay(now), self._global.delay(now))
+                    if delay <= 0:
+                        bucket.tokens -= 1
+                        self._global.tokens -= 1
+                        break
+                    await asyncio.sleep(delay)
+        finally:
+            self._set_waiting(limit.route, -1)
+
+        waited = time.monotonic() - start
+        self._wait_total[limit.route] = self._wait_total.get(limit.route, 0.0) + waited
+        DELIVERY_WAIT_HISTOGRAM.labels(limit.route).observe(waited)
+        return waited
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, limit: RouteLimit, major: int) -> AsyncIterator[None]:
+        """Context manager around a single paced call."""
+        await self.wait(limit, major)
+        yield
+
+
+SCHEDULER = RouteScheduler()
+
+
+def resolve_messageable(client: Zenox, channel_id: int, guild_id: int) -> discord.TextChannel | discord.Thread | discord.PartialMessageable | None:
+    """Returns the channel from cache, or a PartialMessageable to send to without fetching the channel first.
+
+    A cluster worker only caches the channels of its own shards, fetching the others would cost one request
+    per guild of a broadcast. A deleted channel surfaces as discord.NotFound on send. None if the cached
+    channel cannot take messages."""
+    channel = client.get_channel(channel_id)
+    if channel is None:
+        return client.get_partial_messageable(channel_id, guild_id=guild_id)
+    if isinstance(channel, (discord.TextChannel, discord.Thread)):
+        return channel
+    return None
+
+
+def role_mention(client: Zenox, guild_id: int, role_id: int) -> str | None:
+    """Mention of the stored role. Checked against the guild if this process caches it, otherwise the stored
+    id is trusted, Discord renders an unknown role mention as plain text. None if the role is gone."""
+    guild = client.get_guild(guild_id)
+    if guild is None:
+        return f"<@&{role_id}>"
+    role = guild.get_role(role_id)
+    return role.mention if role is not None else None
+
+
+async def resolve_guild(client: Zenox, guild_id: int) -> discord.Guild:
+    """Returns the guild from cache, or fetches it through the scheduler."""
+    guild = client.get_guild(guild_id)
+    if guild is not None:
+        return guild
+    async with SCHEDULER.acquire(FETCH_GUILD, guild_id):
+        return await client.fetch_guild(guild_id)
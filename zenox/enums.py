@@ -21,3 +21,23 @@ class Game(StrEnum):
     HONKAI = "Honkai Impact 3rd"
     ZZZ = "Zenless Zone Zero"
     HNA = "Honkai: Nexus Anima"
+
+
+class BroadcastState(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+
+
+class OutboxState(StrEnum):
+    PENDING = "pending"
+    CLAIMED = "claimed"
+    SENT = "sent"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
@@ -1,4 +1,4 @@
-from prometheus_client import Gauge
+from prometheus_client import Counter, Gauge, Histogram
 __all__ = (
     "CONNECTION_GAUGE",
     "LATENCY_GAUGE",
@@ -8,6 +8,24 @@ __all__ = (
     "CPU_USAGE_GAUGE",
     "UPTIME_GAUGE",
     "GUILD_LOCALE_GAUGE",
+    "DELIVERY_QUEUE_GAUGE",
+    "DELIVERY_WAIT_HISTOGRAM",
+    "OUTBOX_DELIVERY_COUNTER",
+    "CACHE_HIT_COUNTER",
+    "CACHE_MISS_COUNTER",
+    "CACHE_EVICTION_COUNTER",
+    "CACHE_SIZE_GAUGE",
+    "CHECK_CODES_DURATION_HISTOGRAM",
+    "HTTP_CACHE_COUNTER",
+    "PUBLISHED_CODES_GAUGE",
+    "PUBLISHED_CODES_BYTES_GAUGE",
+    "HTTP_REQUEST_HISTOGRAM",
+    "HTTP_ERROR_COUNTER",
+    "HTTP_RETRY_COUNTER",
+    "CIRCUIT_STATE_GAUGE",
+    "QUOTA_REMAINING_GAUGE",
+    "QUOTA_UNITS_COUNTER",
+    "LEADER_GAUGE",
 )
 
 METRIC_PREFIX = "discord_"
@@ -53,4 +71,115 @@ GUILD_LOCALE_GAUGE = Gauge(
     METRIC_PREFIX + "guild_locale",
     "Locales of guilds the bot is in",
     ["country"],
-)
\ No newline at end of file
+)
+
+DELIVERY_QUEUE_GAUGE = Gauge(
+    METRIC_PREFIX + "delivery_queue_depth",
+    "Number of REST calls waiting for a rate limit token",
+    ["route"],
+)
+
+DELIVERY_WAIT_HISTOGRAM = Histogram(
+    METRIC_PREFIX + "delivery_wait_seconds",
+    "Time REST calls spent waiting for a rate limit token",
+    ["route"],
+    buckets=(0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+OUTBOX_DELIVERY_COUNTER = Counter(
+    METRIC_PREFIX + "outbox_deliveries",
+    "Number of finished outbox deliveries",
+    ["kind", "state"],
+)
+
+CACHE_HIT_COUNTER = Counter(
+    METRIC_PREFIX + "cache_hits",
+    "Number of in-memory cache lookups that found an entry",
+    ["cache"],
+)
+
+CACHE_MISS_COUNTER = Counter(
+    METRIC_PREFIX + "cache_misses",
+    "Number of in-memory cache lookups that found no entry",
+    ["cache"],
+)
+
+CACHE_EVICTION_COUNTER = Counter(
+    METRIC_PREFIX + "cache_evictions",
+    "Number of entries evicted from an in-memory cache",
+    ["cache", "reason"],
+)
+
+CACHE_SIZE_GAUGE = Gauge(
+    METRIC_PREFIX + "cache_size",
+    "Number of entries in an in-memory cache",
+    ["cache"],
+)
+
+CHECK_CODES_DURATION_HISTOGRAM = Histogram(
+    METRIC_PREFIX + "check_codes_duration_seconds",
+    "Time one code check took per game",
+    ["game", "outcome"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 240.0, 300.0),
+)
+
+HTTP_CACHE_COUNTER = Counter(
+    METRIC_PREFIX + "http_cache_requests",
+    "Number of conditional requests by whether the source changed",
+    ["cache", "result"],
+)
+
+PUBLISHED_CODES_GAUGE = Gauge(
+    METRIC_PREFIX + "published_codes",
+    "Number of codes in the in-memory published code set",
+    ["game"],
+)
+
+PUBLISHED_CODES_BYTES_GAUGE = Gauge(
+    METRIC_PREFIX + "published_codes_bytes",
+    "Approximate memory used by the in-memory published code set",
+    ["game"],
+)
+
+HTTP_REQUEST_HISTOGRAM = Histogram(
+    METRIC_PREFIX + "http_request_duration_seconds",
+    "Latency of outgoing HTTP requests",
+    ["host", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+HTTP_ERROR_COUNTER = Counter(
+    METRIC_PREFIX + "http_request_errors",
+    "Number of outgoing HTTP requests that failed or returned a retryable status",
+    ["host", "reason"],
+)
+
+HTTP_RETRY_COUNTER = Counter(
+    METRIC_PREFIX + "http_request_retries",
+    "Number of retried outgoing HTTP requests",
+    ["host"],
+)
+
+CIRCUIT_STATE_GAUGE = Gauge(
+    METRIC_PREFIX + "circuit_state",
+    "State of the circuit breaker per upstream (0 closed, 1 half open, 2 open)",
+    ["upstream"],
+)
+
+QUOTA_REMAINING_GAUGE = Gauge(
+    METRIC_PREFIX + "api_quota_remaining",
+    "API units left in the current quota day",
+    ["api"],
+)
+
+QUOTA_UNITS_COUNTER = Counter(
+    METRIC_PREFIX + "api_quota_units",
+    "Number of API units spent per method",
+    ["api", "method"],
+)
+
+LEADER_GAUGE = Gauge(
+    METRIC_PREFIX + "leader",
+    "Whether this replica holds the lease (1) or is a standby (0)",
+    ["lease"],
+)
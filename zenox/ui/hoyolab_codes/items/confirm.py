@@ -1,18 +1,22 @@
 from __future__ import annotations
 
 import discord
+from discord.utils import MISSING
 from typing import TYPE_CHECKING, Any
 
 from zenox import emojis
 from zenox.constants import ZENOX_LOCALES, HOYO_REDEEM_URLS, GAME_THUMBNAILS
-from zenox.db.classes import Guild, SpecialProgram
-from zenox.db.mongodb import DB
+from zenox.db.classes import Broadcast, DeliveryRecord, SpecialProgram
+from zenox.db.mongodb import DB, channel_configured
+from zenox.delivery import SCHEDULER, SEND_MESSAGE, BroadcastHandler, Deliver, OutboxWorker, resolve_messageable, role_mention
+from zenox.enums import Game
 from zenox.embeds import Embed
 from zenox.l10n import LocaleStr
 
 from ...components import Button, View
 
 if TYPE_CHECKING:
+    from zenox.bot import Zenox
     from ..view import HoyolabCodesUI  # noqa: F401
     from ....types import Interaction
 
@@ -79,7 +83,7 @@ class ConfirmButton(Button["HoyolabCodesUI"]):
 
         if self.view.action == "Global":
             await self.view.data._update_val("codes_published", True)
-            await self._publish_globally(i, translations, embeds, view)
+            await self._publish_globally(i)
         elif self.view.action in ("Dev", "Guild"):
             assert self.view.guild_id is not None
             success = await self._publish_to_guild(i, self.view.guild_id, translations, embeds, view)
@@ -100,64 +104,88 @@ class ConfirmButton(Button["HoyolabCodesUI"]):
         translations: dict[discord.Locale, dict[str, str]],
         embeds: dict[discord.Locale, Embed],
         view: View,
-        *,
-        guild_verified: bool = False,
     ) -> bool:
         """Sends stream codes to a single guild's configured codes channel.
-        Returns True if the guild qualified and the message was sent.
-        Pass guild_verified=True to skip the eligibility DB check (e.g. when already filtered globally)."""
+        Returns True if the guild qualified and the message was sent."""
         game = self.view.data.game
 
-        if not guild_verified:
-            guild_data = await DB.guilds.find_one(
-                {"id": guild_id, f"codes.{game.value}.channel": {"$ne": None}},
-                {"_id": 0, "id": 1},
-            )
-            if not guild_data:
-                return False
-
-        guild = await Guild.new(guild_id)
-        channel_id = guild.codes[game].channel
-        if channel_id is None:
-            return False
-
-        channel = i.client.get_channel(channel_id) or await i.client.fetch_channel(channel_id)
-        if not channel or not isinstance(channel, (discord.TextChannel, discord.Thread)):
+        record = await DeliveryRecord.find_one(
+            "codes",
+            game,
+            {"id": guild_id, **channel_configured("codes", game.value)},
+        )
+        if record is None:
             return False
 
-        role = None
-        role_id = guild.codes[game].mention_role
-        if role_id is not None:
-            guild_obj = i.client.get_guild(guild_id) or await i.client.fetch_guild(guild_id)
-            role = guild_obj.get_role(role_id)
+        return await _send_stream_codes(i.client, game, record, translations, embeds, view)
 
-        send_msg = (
-            f"{role.mention + ' ' if role is not None else ''}"
-            f"{'@everyone ' if guild.codes[game].mention_everyone else ''}"
-            f"{translations[guild.language]['content']}"
+    async def _publish_globally(self, i: Interaction) -> None:
+        """Sends stream codes to all guilds that have a codes channel configured for this game."""
+        data = self.view.data
+        await OutboxWorker.publish(
+            i.client,
+            f"stream_codes:{data.game.value}:{data.version}",
+            "stream_codes",
+            {"game": data.game.value, "version": data.version},
         )
-        await channel.send(send_msg, embed=embeds[guild.language], view=view)
-        return True
 
-    async def _publish_globally(
-        self,
-        i: Interaction,
-        translations: dict[discord.Locale, dict[str, str]],
-        embeds: dict[discord.Locale, Embed],
-        view: View,
-    ) -> None:
-        """Sends stream codes to all guilds that have a codes channel configured for this game."""
-        game = self.view.data.game
 
-        cursor = DB.guilds.find(
-            {f"codes.{game.value}.channel": {"$ne": None}},
-            {"_id": 0, "id": 1},
-        )
-        async for guild_data in cursor:
-            try:
-                await self._publish_to_guild(i, guild_data["id"], translations, embeds, view, guild_verified=True)
-            except Exception as e:
-                i.client.capture_exception(e)
-
-        assert i.client.db_config is not None, "Bot configuration is not loaded yet."
-        await i.client.db_config._update_module_setting(module_name="stream_codes_config", game=game, setting="state", value=5)
\ No newline at end of file
+async def _send_stream_codes(
+    client: Zenox,
+    game: Game,
+    record: DeliveryRecord,
+    translations: dict[discord.Locale, dict[str, str]],
+    embeds: dict[discord.Locale, Embed],
+    view: View,
+    *,
+    nonce: str = MISSING,
+) -> bool:
+    """Sends stream codes to a single guild's configured codes channel. Returns True if the message was sent."""
+    channel_id = record.channel
+    if channel_id is None:
+        return False
+
+    channel = resolve_messageable(client, channel_id, record.guild_id)
+    if not channel:
+        return False
+
+    mention = None
+    role_id = record.mention_role
+    if role_id is not None:
+        mention = role_mention(client, record.guild_id, role_id)
+
+    send_msg = (
+        f"{mention + ' ' if mention is not None else ''}"
+        f"{'@everyone ' if record.mention_everyone else ''}"
+        f"{translations[record.language]['content']}"
+    )
+    async with SCHEDULER.acquire(SEND_MESSAGE, channel_id):
+        await channel.send(send_msg, embed=embeds[record.language], view=view, nonce=nonce)
+    return True
+
+
+async def _prepare_stream_codes_broadcast(client: Zenox, broadcast: Broadcast) -> Deliver:
+    game = Game(broadcast.payload["game"])
+    data = await SpecialProgram.new(game=game, version=broadcast.payload["version"])
+    translations, embeds, view = _pre_translate(data)
+
+    async def deliver(record: DeliveryRecord, nonce: str) -> bool:
+        return await _send_stream_codes(client, game, record, translations, embeds, view, nonce=nonce)
+
+    return deliver
+
+
+async def _complete_stream_codes_broadcast(client: Zenox, broadcast: Broadcast) -> None:
+    assert client.db_config is not None, "Bot configuration is not loaded yet."
+    await client.db_config._update_module_setting(module_name="stream_codes_config", game=Game(broadcast.payload["game"]), setting="state", value=5)
+
+
+OutboxWorker.register(
+    "stream_codes",
+    BroadcastHandler(
+        module_name="codes",
+        audience=lambda payload: channel_configured("codes", payload["game"]),
+        prepare=_prepare_stream_codes_broadcast,
+        complete=_complete_stream_codes_broadcast,
+    ),
+)
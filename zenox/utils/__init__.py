@@ -2,3 +2,5 @@ from __future__ import annotations
 
 from .misc import *  # noqa: F403
 from .start import *  # noqa: F403
+from .cache import *  # noqa: F403
+from .http_cache import *  # noqa: F403
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Iterator, Protocol, TypeVar
+
+from zenox.metrics import CACHE_EVICTION_COUNTER, CACHE_HIT_COUNTER, CACHE_MISS_COUNTER, CACHE_SIZE_GAUGE
+
+__all__ = ("Cache", "LRUCache")
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class Cache(Protocol[K, V]):
+    """Interface of the in-memory caches used by the DB classes."""
+
+    def get(self, key: K) -> V | None:
+        """Returns the value and counts a hit or miss."""
+        ...
+
+    def peek(self, key: K) -> V | None:
+        """Returns the value without touching recency or metrics."""
+        ...
+
+    def set(self, key: K, value: V) -> None: ...
+
+    def pop(self, key: K) -> V | None: ...
+
+    def clear(self) -> None: ...
+
+    def __contains__(self, key: object) -> bool: ...
+
+    def __len__(self) -> int: ...
+
+    def __iter__(self) -> Iterator[K]: ...
+
+
+class LRUCache(Generic[K, V]):
+    """A size-capped cache evicting the least recently used entry, with an optional time to live per entry."""
+
+    def __init__(self, name: str, *, maxsize: int, ttl: float | None = None) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def _expired(self, expires_at: float) -> bool:
+        return self.ttl is not None and expires_at <= time.monotonic()
+
+    def _evict(self, key: K, reason: str) -> None:
+        del self._data[key]
+        CACHE_EVICTION_COUNTER.labels(self.name, reason).inc()
+        CACHE_SIZE_GAUGE.labels(self.name).set(len(self._data))
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            CACHE_MISS_COUNTER.labels(self.name).inc()
+            return None
+        if self._expired(entry[0]):
+            self._evict(key, "expired")
+            CACHE_MISS_COUNTER.labels(self.name).inc()
+            return None
+        self._data.move_to_end(key)
+        CACHE_HIT_COUNTER.labels(self.name).inc()
+        return entry[1]
+
+    def peek(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None or self._expired(entry[0]):
+            return None
+        return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._evict(next(iter(self._data)), "size")
+        CACHE_SIZE_GAUGE.labels(self.name).set(len(self._data))
+
+    def pop(self, key: K) -> V | None:
+        entry = self._data.pop(key, None)
+        CACHE_SIZE_GAUGE.labels(self.name).set(len(self._data))
+        if entry is None:
+            return None
+        return entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+        CACHE_SIZE_GAUGE.labels(self.name).set(0)
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._data.get(key)  # pyright: ignore[reportArgumentType]
+        return entry is not None and not self._expired(entry[0])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Mapping
+
+from zenox.metrics import HTTP_CACHE_COUNTER
+
+if TYPE_CHECKING:
+    from zenox.clients.http import HTTPClient
+
+__all__ = ("CachedResponse", "HTTPCache")
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    url: str
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    data: Any
+
+
+class HTTPCache:
+    """Conditional GETs for JSON sources polled on a timer.
+
+    Sends the validators of the last confirmed response as If-None-Match / If-Modified-Since and compares a
+    content hash for servers that ignore them. A response only becomes the new baseline once the caller
+    confirms it was processed, so a failed run is retried on the next poll."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._confirmed: dict[str, CachedResponse] = {}
+
+    def _conditional_headers(self, url: str) -> dict[str, str]:
+        entry = self._confirmed.get(url)
+        if entry is None:
+            return {}
+        headers: dict[str, str] = {}
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    async def get_json(
+        self, http: HTTPClient, url: str, *, headers: Mapping[str, str] | None = None
+    ) -> CachedResponse | None:
+        """Returns the response, or None if it did not change since the last confirmed one."""
+        response = await http.get(url, headers={**(headers or {}), **self._conditional_headers(url)})
+        if response.status == 304:
+            HTTP_CACHE_COUNTER.labels(self.name, "not_modified").inc()
+            return None
+        response.raise_for_status()
+        body = response.body
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = self._confirmed.get(url)
+        if entry is not None and entry.digest == digest:
+            HTTP_CACHE_COUNTER.labels(self.name, "unchanged").inc()
+            # Keep the newest validators, the server may rotate them without changing the content
+            entry.etag, entry.last_modified = etag, last_modified
+            return None
+
+        HTTP_CACHE_COUNTER.labels(self.name, "changed").inc()
+        return CachedResponse(url=url, etag=etag, last_modified=last_modified, digest=digest, data=json.loads(body))
+
+    def confirm(self, response: CachedResponse) -> None:
+        """Makes a processed response the baseline for the next conditional request."""
+        self._confirmed[response.url] = response
@@ -0,0 +1,3 @@
+from __future__ import annotations
+
+from .receiver import *  # noqa: F403
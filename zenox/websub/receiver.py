@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Coroutine
+
+from aiohttp import web
+
+from ..enums import Game, PrintColors
+
+if TYPE_CHECKING:
+    from ..clients.http import HTTPClient
+
+__all__ = ("PushedVideo", "WebSubReceiver", "parse_notification", "topic_url")
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+YT_NS = "{http://www.youtube.com/xml/schemas/2015}"
+
+OnVideos = Callable[[Game, list[str]], Coroutine[Any, Any, None]]
+
+
+def topic_url(channel_id: str) -> str:
+    return f"https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+
+
+@dataclass(slots=True)
+class PushedVideo:
+    video_id: str
+    channel_id: str
+
+
+def parse_notification(body: bytes) -> list[PushedVideo]:
+    """Extracts the videos of an Atom push notification. Deleted entries carry no video id and are skipped."""
+    root = ET.fromstring(body)
+    videos: list[PushedVideo] = []
+    for entry in root.iter(f"{ATOM_NS}entry"):
+        video_id = entry.findtext(f"{YT_NS}videoId")
+        channel_id = entry.findtext(f"{YT_NS}channelId")
+        if video_id and channel_id:
+            videos.append(PushedVideo(video_id=video_id, channel_id=channel_id))
+    return videos
+
+
+class WebSubReceiver:
+    """Receives YouTube upload notifications from a WebSub (PubSubHubbub) hub.
+
+    Serves one callback per channel at /websub/{channel_id}, answers the hub's verification requests,
+    checks the X-Hub-Signature HMAC of every push and hands the video ids to on_videos. Subscriptions are
+    renewed before their lease runs out. hub_url can point at a local stand-in hub for testing.
+
+    The callback is public, so a secret is required: without it anyone could push forged video ids."""
+
+    RENEW_MARGIN: ClassVar[int] = 3600
+    LEASE_SECONDS: ClassVar[int] = 5 * 24 * 3600
+    RETRY_DELAY: ClassVar[int] = 300
+
+    def __init__(
+        self,
+        *,
+        http: HTTPClient,
+        channels: dict[Game, str],
+        callback_url: str,
+        hub_url: str,
+        secret: str,
+        on_videos: OnVideos,
+        host: str = "0.0.0.0",
+        port: int = 8090,
+    ) -> None:
+        if not secret:
+            raise ValueError("WebSub needs a secret to verify pushes, set websub_secret or unset websub_callback_url")
+        self.http = http
+        self.games = {channel_id: game for game, channel_id in channels.items()}
+        self.callback_url = callback_url.rstrip("/")
+        self.hub_url = hub_url
+        self.secret = secret
+        self.on_videos = on_videos
+        self.host = host
+        self.port = port
+        self._expires_at: dict[str, float] = {}
+        # Channels with a subscribe request awaiting the hub's verification
+        self._pending: set[str] = set()
+        self._runner: web.AppRunner | None = None
+        self._renew_task: asyncio.Task[None] | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/websub/{channel_id}", self._verify)
+        app.router.add_post("/websub/{channel_id}", self._notify)
+        return app
+
+    async def start(self) -> None:
+        """Starts the endpoint, subscribes to every channel and keeps the subscriptions renewed."""
+        self._runner = web.AppRunner(self.application())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"[WebSub] Info - {PrintColors.OKCYAN}Listening on {self.host}:{self.port}, callbacks at {self.callback_url}{PrintColors.ENDC}")
+        self._renew_task = asyncio.create_task(self._renew())
+
+    async def stop(self) -> None:
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            self._renew_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def subscribe(self, channel_id: str) -> bool:
+        data = {
+            "hub.callback": f"{self.callback_url}/websub/{channel_id}",
+            "hub.topic": topic_url(channel_id),
+            "hub.mode": "subscribe",
+            "hub.verify": "async",
+            "hub.lease_seconds": str(self.LEASE_SECONDS),
+            "hub.secret": self.secret,
+        }
+        self._pending.add(channel_id)
+        response = await self.http.request("POST", self.hub_url, data=data)
+        if response.status not in (202, 204):
+            self._pending.discard(channel_id)
+            print(f"[WebSub] Error - {PrintColors.FAIL}Hub rejected subscription for {channel_id} with status {response.status}{PrintColors.ENDC}")
+            return False
+        return True
+
+    async def _renew(self) -> None:
+        while True:
+            now = time.time()
+            for channel_id in self.games:
+                if self._expires_at.get(channel_id, 0) - self.RENEW_MARGIN > now:
+                    continue
+                try:
+                    if await self.subscribe(channel_id):
+                        # Retried after RETRY_DELAY unless the hub verifies the subscription and sets the real lease
+                        self._expires_at[channel_id] = max(self._expires_at.get(channel_id, 0), now + self.RENEW_MARGIN + self.RETRY_DELAY)
+                except Exception as e:
+                    print(f"[WebSub] Error - {PrintColors.FAIL}Subscribing to {channel_id} failed:{PrintColors.ENDC} {e}")
+            next_renewal = min(self._expires_at.get(channel_id, 0) for channel_id in self.games) - self.RENEW_MARGIN
+            await asyncio.sleep(max(next_renewal - time.time(), self.RETRY_DELAY))
+
+    async def _verify(self, request: web.Request) -> web.Response:
+        """Answers the hub's intent verification by echoing the challenge, only for subscriptions this process
+        requested. The callback is public, so anyone could ask it to confirm an unsubscribe or a made-up lease."""
+        channel_id = request.match_info["channel_id"]
+        mode = request.query.get("hub.mode")
+        topic = request.query.get("hub.topic")
+        challenge = request.query.get("hub.challenge")
+        if channel_id not in self.games or topic != topic_url(channel_id) or challenge is None:
+            return web.Response(status=404)
+
+        # The receiver never unsubscribes, so an unsubscribe is never confirmed
+        if mode != "subscribe" or channel_id not in self._pending:
+            return web.Response(status=404)
+
+        self._pending.discard(channel_id)
+        lease_seconds = request.query.get("hub.lease_seconds", "")
+        # The hub may grant less than requested, never trust it to be longer
+        lease = min(int(lease_seconds), self.LEASE_SECONDS) if lease_seconds.isdigit() else self.LEASE_SECONDS
+        self._expires_at[channel_id] = time.time() + lease
+        print(f"[WebSub] Info - {PrintColors.OKBLUE}Subscription for {channel_id} verified, lease {lease}s{PrintColors.ENDC}")
+        return web.Response(text=challenge)
+
+    def _signature_valid(self, body: bytes, header: str | None) -> bool:
+        if header is None or "=" not in header:
+            return False
+        algorithm, signature = header.split("=", 1)
+        if algorithm not in ("sha1", "sha256", "sha384", "sha512"):
+            return False
+        expected = hmac.new(self.secret.encode(), body, algorithm).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    async def _notify(self, request: web.Request) -> web.Response:
+        channel_id = request.match_info["channel_id"]
+        game = self.games.get(channel_id)
+        if game is None:
+            return web.Response(status=404)
+
+        body = await request.read()
+        if not self._signature_valid(body, request.headers.get("X-Hub-Signature")):
+            # The spec asks for a 2xx here, so a forger cannot tell whether the signature was checked
+            print(f"[WebSub] Warning - {PrintColors.WARNING}Ignoring push for {channel_id} with an invalid signature{PrintColors.ENDC}")
+            return web.Response(status=202)
+
+        try:
+            videos = parse_notification(body)
+        except ET.ParseError:
+            return web.Response(status=400)
+
+        video_ids = [video.video_id for video in videos if video.channel_id == channel_id]
+        if video_ids:
+            # Answer the hub right away, the notification itself can take a while
+            task = asyncio.create_task(self.on_videos(game, video_ids))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return web.Response(status=204)